@@ -1,11 +1,20 @@
 # These are the agents of the Connect-4 project
-# Every agent must be warped into a def function
+# Every agent must be warped into a def function, and listed in AGENTS at the
+# bottom of this file to be offered by main and the tournament
 # The signiture must be algo(int[][] board, int who_goes_next, int winning_count, func heuristic, int max_depth) -> int column_to_go_next
 
 import numpy as np
 
+import book
 import helper
+import mcts
+import parallel
+import search
+import solver
+import stats
 import time
+from bitboard import Bitboard
+from search import SearchTimeout
 
 
 # an example agent who moves randomly
@@ -32,133 +41,163 @@ def agent_user(b, n, w, h, d):
             print(f'Invalid move; try somewhere else...')
             print(f'Avalible columns: {play}')
 
+# The start shared by the minimax agents: early positions are answered from
+# the opening book (see book.py), and an empty board with the center column.
+# Input: int[][] b = board
+#        int     n = agent ID (as shown on board) playing FOR
+#        int     w = winning by connect w
+# Return: (int move, Bitboard pos) = the book or center move, None if the
+#         position has to be searched; pos is b with the opponent of n to
+#         move, as minimax searches the root
+def opening_move(b, n, w):
+    pos = Bitboard.from_array(b, w, turn=n)
+    move = book.lookup(pos)
+    # If empty board -> going first -> the center column is the optimal move
+    if move is None and not np.any(b):
+        move = len(b) // 2
+    pos.set_turn(3 - n)
+    return move, pos
+
 # Minimax algorithm with Alpha-beta pruning
+# The search itself runs on a bitboard, see search.minimax
+# Searched positions are kept in a transposition table that lives for the
+# whole process, see search.get_table
+# Work done is added to stats.current when someone is collecting, see stats.py
 # Input: int[][] b = board
 #        int     n = agent ID (as shown on board) playing FOR
 #        int     w = winning by connect w
 #        func    h = the heuristic function to evaluate a board
 #        int     d = depth limit
-# Recursive parameters:
-#            final = True if returning to main, else False
-#       minimizing = if the current layer is minimizing (as in minimax)
-#      alpha, beta = the alpha and beta as in ab-pruning
-def agent_minimax(b, n, w, h, d, final=True, minimizing = False, alpha = -9999999, beta = 9999999):
-    l, t = helper.get_avalible_column(b)
-    play = np.arange(len(l))[l]
-
-    # Make the moves non-deterministic
-    # Given non-perfect heuristics
-    np.random.shuffle(play)
-    
-    # If empty board -> going first -> 3 is the optimal move
-    if (np.all(t==0)):
-        return 3
+def agent_minimax(b, n, w, h, d):
+    move, pos = opening_move(b, n, w)
+    if move is not None:
+        return move
 
     # Is more moves be made onto this board?
-    is_terminal = not(helper.get_winner(b, w) == 0) or len(play) == 0
-    if is_terminal:
-        # winning -> high score
-        if helper.get_winner(b, w) == n:
-            return (None, 9999999)
-        # losing -> low score
-        elif helper.get_winner(b, w) == int(n==1)+1:
-            return (None, -9999999)
-        else:
-            # No more valid moves, and no winner
-            if final:
-                # This should NEVER be evaluated if minimax is called from main
-                print("TERMINAL at agent_minimax with no winner. ")
-            return (None, 0)
+    if pos.get_winner() != 0:
+        # This should NEVER be evaluated if minimax is called from main
+        print("TERMINAL at agent_minimax. ")
+        return agent_random(b, n, w, h, d)
     # Depth limit reached, resorting to heuristics 
     if d == 0:
-        if final:
-            # Why are you using minimax with depth = 0?
-            print("Using minimax with depth = 0. Resorting to random. ")
-            return agent_random(b, n, w, h, d)
-        else:
-            return (None, h(b, n, w))
+        # Why are you using minimax with depth = 0?
+        print("Using minimax with depth = 0. Resorting to random. ")
+        return agent_random(b, n, w, h, d)
+    tt = search.get_table(n, h, w)
+    tt.new_search()
+    st = stats.current
+    column, _ = search.minimax(pos, n, h, d, ctx=search.SearchContext(tt, stats=st))
+    if st is not None:
+        st.depth += d
+    return int(column)
     
+# Minimax with the root moves searched in parallel by a pool of worker
+# processes (parallel.WORKERS, one per core); plays the same move as
+# agent_minimax at the same depth, see parallel.parallel_minimax
+# Input: int[][] b = board
+#        int     n = agent ID (as shown on board) playing FOR
+#        int     w = winning by connect w
+#        func    h = the heuristic function to evaluate a board
+#        int     d = depth limit
+def agent_minimax_parallel(b, n, w, h, d):
+    move, pos = opening_move(b, n, w)
+    if move is not None:
+        return move
 
-    # playing against n -> playing for int(n==1)+1
-    if minimizing:
-        value = -9999999
-        # Randomise column to start
-        column = np.random.choice(play)
-        for c in play:
-            # Create a copy of the board
-            b_copy = b.copy()
-            # Drop a piece in the temporary board and record score
-            b_copy = helper.make_move(b_copy, n, c)
-            new_score = agent_minimax(b_copy, n, w, h, d - 1, final = False, minimizing = False, alpha = alpha, beta = beta)[1]
-            if new_score > value:
-                value = new_score
-                # Make 'column' the best scoring column we can get
-                column = c
-            alpha = max(alpha, value)
-            if alpha >= beta:
-                break
-        if final:
-            # This should never happen
-            print("Minimax returned move while minimizing.")
-            return int(column)
-        else:
-            return column, value
-    # playing for n
-    else: 
-        value = 9999999
-        # Randomise column to start
-        column = np.random.choice(play)
-        for c in play:
-            # Create a copy of the board
-            b_copy = b.copy()
-            # Drop a piece in the temporary board and record score
-            b_copy = helper.make_move(b_copy, int(n==1)+1, c)
-            new_score = agent_minimax(b_copy, n, w, h, d - 1, final = False, minimizing = True, alpha = alpha, beta = beta)[1]
-            if new_score < value:
-                value = new_score
-                # Make 'column' the best scoring column we can get
-                column = c
-            beta = min(beta, value)
-            if alpha >= beta:
-                break
-        if final:
-            # Print the eval score (or not)
-            # print(f'With score: {h(helper.make_move(b, n, column), n, w)}')
-            return int(column)
-        else:
-            return column, value
-    # Should never teach this
-    return None
-    
-# Monte Carlo algorithm 
+    if pos.get_winner() != 0 or d == 0:
+        return agent_minimax(b, n, w, h, d)
+    st = stats.current
+    column, _ = parallel.parallel_minimax(pos, n, h, d, stats=st)
+    if st is not None:
+        st.depth += d
+    return int(column)
+
+# Minimax with iterative deepening under a time budget
+# Searches depth 1, 2, 3, ... and plays the best move of the last depth that
+# finished in time, see search.iterative_deepening
+# Input: int[][] b = board
+#        int     n = agent ID (as shown on board) playing FOR
+#        int     w = winning by connect w
+#        func    h = the heuristic function to evaluate a board
+#        int     d = time in seconds, as in agent_mcts
+def agent_minimax_id(b, n, w, h, d):
+    move, pos = opening_move(b, n, w)
+    if move is not None:
+        return move
+
+    tt = search.get_table(n, h, w)
+    tt.new_search()
+    st = stats.current
+    column, _, depth = search.iterative_deepening(pos, n, h, d, tt, stats=st)
+    if st is not None:
+        st.depth += depth
+    return int(column)
+
+# Perfect play: the opening book, then the solver, see book.py and solver.py
+# The solver gets half of the time; if it cannot prove the position in time,
+# the rest goes to agent_minimax_id with the given heuristic.
+# Input: int[][] b = board
+#        int     n = agent ID (as shown on board) playing FOR
+#        int     w = winning by connect w
+#        func    h = the heuristic function used when the solver runs out of time
+#        int     d = time in seconds, as in agent_mcts
+def agent_solver(b, n, w, h, d):
+    pos = Bitboard.from_array(b, w, turn=n)
+    move = book.lookup(pos)
+    if move is not None:
+        return move
+    s = solver.get_solver(pos.c, pos.r, w)
+    nodes = s.nodes
+    try:
+        column, _ = s.best_move(pos, time.time() + d/2)
+        return int(column)
+    except SearchTimeout:
+        return agent_minimax_id(b, n, w, h, d/2)
+    finally:
+        if stats.current is not None:
+            stats.current.nodes += s.nodes - nodes
+
+# Monte Carlo tree search spread over a pool of worker processes, either as
+# independent trees merged at the deadline or as one tree whose playouts run
+# in every worker, see parallel.parallel_mcts (parallel.MCTS_MODE, parallel.WORKERS)
+# Input: same as agent_mcts; d = time in seconds
+def agent_mcts_parallel(b, n, w, h, d):
+    pos = Bitboard.from_array(b, w, turn=n)
+    if not pos.legal_moves():
+        return -1  # No legal moves
+    return parallel.parallel_mcts(pos, n, d, stats=stats.current)
+
+# Monte Carlo tree search (UCT)
+# The tree is kept between moves, and the part below the moves actually
+# played is reused on the next turn, see mcts.get_tree
+# Playouts from each new leaf are run as one NumPy batch, see playout.py
 # Input: int[][] b = board
 #        int     n = agent ID (as shown on board) playing FOR
 #        int     w = winning by connect w
 #        func    h = the heuristic function to evaluate a board
 #        int     d = time 
 # Retrun:
-#        best move = which is the move with a higher chance of winning
+#        best move = the most visited move at the root
 def agent_mcts(b, n, w, h, d):
-    start_time = time.time()
-    legal_moves = [col for col, is_legal in enumerate(helper.get_avalible_column(b)[0]) if is_legal]
-    if not legal_moves:
+    pos = Bitboard.from_array(b, w, turn=n)
+    if not pos.legal_moves():
         return -1  # No legal moves
 
-    simulations = {}
-    for move in legal_moves:
-        simulations[move] = {'wins': 0, 'plays': 0}
-
-    while time.time() - start_time < d:  # d is time in seconds which I made it to take 5 seconds to simulate all possible outcome
-        for move in legal_moves:
-            b_copy = b.copy()
-            b_copy = helper.make_move(b_copy, n, move)
-            outcome = helper.simulate_random_playout(b_copy, n, w)
-            if outcome == n:
-                simulations[move]['wins'] += 1
-            simulations[move]['plays'] += 1
-
-    # Select the move with the highest win ratio
-    best_move = max(simulations, key=lambda x: simulations[x]['wins'] / simulations[x]['plays'])
-    return best_move
-
+    tree = mcts.get_tree(pos, n)
+    column = tree.search(d, mcts.BATCH)
+    if stats.current is not None:
+        stats.current.simulations += tree.simulations
+        stats.current.playouts += tree.playouts
+    return int(column)
 
+# Every agent by name, in the order main lists them
+AGENTS = {
+    'agent_mcts': agent_mcts,
+    'agent_mcts_parallel': agent_mcts_parallel,
+    'agent_minimax': agent_minimax,
+    'agent_minimax_id': agent_minimax_id,
+    'agent_minimax_parallel': agent_minimax_parallel,
+    'agent_random': agent_random,
+    'agent_solver': agent_solver,
+    'agent_user': agent_user,
+}
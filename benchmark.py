@@ -0,0 +1,249 @@
+# Performance benchmarks of the Connect-4 project
+# Times the helpers, every heuristic, minimax (nodes per second per depth),
+# batched playouts and MCTS (playouts and simulations per second) on a fixed
+# corpus of early, mid and late-game positions drawn from seeded random games.
+# Results are written as JSON and compared against a stored baseline, flagging
+# anything slower by more than a tolerance.
+#
+#   python benchmark.py                    run, write bench_results.json, compare
+#                                          against bench_baseline.json if present
+#   python benchmark.py --save-baseline    also store this run as the baseline
+#   python benchmark.py --quick            shorter timings, for a smoke test
+#   python benchmark.py --size 9 7 5       another board (columns rows connect #);
+#                                          compare it against a baseline of the same size
+#
+# Exits with status 1 if a regression was flagged, and with status 2 if the
+# baseline was run with another --size, --quick or --seed.
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+
+import helper
+import heuristics
+import mcts
+import playout
+import search
+from bitboard import Bitboard
+
+SEED = 560
+# Plies played before a position is taken, per phase, on a 7x6 board; scaled
+# by the number of cells on other boards
+PHASES = {'early': (4, 10), 'mid': (14, 22), 'late': (26, 36)}
+
+
+# Positions of random games that are not over yet, the same on every run.
+# Input: int per_phase = positions per phase
+#        int seed
+#        int c, r, w = board shape
+# Return: {str phase: Bitboard[]}
+def corpus(per_phase=20, seed=SEED, c=7, r=6, w=4):
+    rng = random.Random(seed)
+    positions = {}
+    scale = c * r / 42
+    for phase, (low, high) in PHASES.items():
+        low = int(low * scale)
+        high = int(high * scale)
+        positions[phase] = []
+        while len(positions[phase]) < per_phase:
+            pos = Bitboard(c, r, w)
+            plies = rng.randint(low, high)
+            while len(pos.moves) < plies and pos.winner == 0:
+                pos.play(rng.choice(pos.legal_moves()))
+            if pos.winner == 0:
+                positions[phase].append(pos)
+    return positions
+
+
+# Time f over every argument tuple, repeating the whole list for at least
+# min_time seconds (and at least 3 times). The fastest round is kept, as it is
+# the one least disturbed by the rest of the machine.
+# Return: float = microseconds per call
+def time_calls(f, args, min_time):
+    best = None
+    rounds = 0
+    start = time.perf_counter()
+    while rounds < 3 or time.perf_counter() - start < min_time:
+        t = time.perf_counter()
+        for a in args:
+            f(*a)
+        t = time.perf_counter() - t
+        if best is None or t < best:
+            best = t
+        rounds += 1
+    return best / len(args) * 1e6
+
+
+# Input: {str phase: Bitboard[]} positions
+#        float min_time = seconds spent per benchmark and phase
+#        int max_depth = deepest minimax benchmark
+#        float mcts_seconds = search time per MCTS benchmark position
+# Return: {str name: {'value': float, 'unit': str, 'higher_is_better': bool}}
+def run(positions, min_time=0.5, max_depth=5, mcts_seconds=1.0):
+    results = {}
+
+    def record(name, value, unit, higher_is_better):
+        results[name] = {'value': value, 'unit': unit, 'higher_is_better': higher_is_better}
+        print(f'{name:<45} {value:>12.2f} {unit}')
+
+    for phase, pos_list in positions.items():
+        boards = [pos.to_array() for pos in pos_list]
+        w = pos_list[0].w
+        record(f'helper.get_winner/{phase}', time_calls(helper.get_winner, [(b, w) for b in boards], min_time), 'us/call', False)
+        record(f'helper.get_avalible_column/{phase}', time_calls(helper.get_avalible_column, [(b,) for b in boards], min_time), 'us/call', False)
+        moves = [(b, pos.turn, pos.legal_moves()[0]) for b, pos in zip(boards, pos_list)]
+        record(f'helper.make_move/{phase}', time_calls(helper.make_move, moves, min_time), 'us/call', False)
+        for name, h in heuristics.HEURISTICS.items():
+            record(f'heuristics.{name}/{phase}', time_calls(h, [(b.copy(), pos.turn, w) for b, pos in zip(boards, pos_list)], min_time), 'us/call', False)
+
+    # Minimax as agent_minimax searches a move: the opponent of the player to
+    # move at the root, and that player's table, emptied as at the start of a
+    # tournament game
+    mid = positions['mid'][:5]
+    for d in range(1, max_depth + 1):
+        np.random.seed(SEED)
+        nodes = 0
+        start = time.perf_counter()
+        for pos in mid:
+            n = pos.turn
+            root = Bitboard.from_array(pos.to_array(), pos.w, turn=3 - n)
+            search.tables.clear()
+            tt = search.get_table(n, heuristics.h_offense, pos.w)
+            tt.new_search()
+            ctx = search.SearchContext(tt)
+            search.minimax(root, n, heuristics.h_offense, d, ctx=ctx)
+            nodes += ctx.nodes
+        record(f'agent_minimax/h_offense/depth{d}', nodes / (time.perf_counter() - start), 'nodes/s', True)
+
+    # Raw playout throughput, batched as agent_mcts runs them
+    for phase, pos_list in positions.items():
+        np.random.seed(SEED)
+        games = 0
+        start = time.perf_counter()
+        while True:
+            for pos in pos_list:
+                playout.batch_playout([pos], mcts.BATCH)
+                games += mcts.BATCH
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        record(f'playout.batch_playout/{phase}', games / elapsed, 'playouts/s', True)
+
+    # Whole MCTS searches: games actually played out per second, and
+    # simulations per second; an iteration that ends in a finished game counts
+    # its batch as simulations without playing it out, so tactical positions
+    # score higher on the latter
+    for phase in positions:
+        np.random.seed(SEED)
+        games = 0
+        sims = 0
+        elapsed = 0.0
+        for pos in positions[phase][:3]:
+            tree = mcts.MCTS(pos.copy())
+            tree.search(mcts_seconds / 3, mcts.BATCH)
+            games += tree.playouts
+            sims += tree.simulations
+            elapsed += tree.elapsed
+        record(f'agent_mcts/{phase}', games / elapsed, 'playouts/s', True)
+        record(f'agent_mcts.simulations/{phase}', sims / elapsed, 'simulations/s', True)
+    return results
+
+
+# Compare against a baseline run.
+# Input: dict results, baseline = as returned by run
+#        float tolerance = allowed relative slowdown, 0.2 = 20%
+# Return: [(str name, float baseline, float now, float change)] = regressions,
+#         change being the relative slowdown
+def compare(results, baseline, tolerance=0.2):
+    regressions = []
+    for name, now in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]['value']
+        new = now['value']
+        if old <= 0 or new <= 0:
+            continue
+        # Both kinds expressed as how much slower this run is
+        change = old / new - 1 if now['higher_is_better'] else new / old - 1
+        if change > tolerance:
+            regressions.append((name, old, new, change))
+    return regressions
+
+
+def save(path, results, meta):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2, sort_keys=True)
+
+
+# Return: (dict results, dict meta) = as given to save
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return data['results'], data['meta']
+
+
+# Settings that change what is timed; runs differing in any of them are not compared
+COMPARABLE = ('size', 'quick', 'seed')
+
+
+# Input: dict meta, baseline_meta = of two runs, as given to save
+# Return: [(str setting, baseline value, value of this run)] = settings the two differ in
+def mismatches(meta, baseline_meta):
+    return [(key, baseline_meta.get(key), meta[key]) for key in COMPARABLE if baseline_meta.get(key) != meta[key]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Connect-4 performance benchmarks')
+    parser.add_argument('--out', default='bench_results.json', help='where to write this run')
+    parser.add_argument('--baseline', default='bench_baseline.json', help='run to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative slowdown')
+    parser.add_argument('--quick', action='store_true', help='short timings and shallow searches')
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--size', type=int, nargs=3, default=[7, 6, 4], metavar=('C', 'R', 'W'), help='board columns, rows and connect #')
+    args = parser.parse_args()
+
+    if args.quick:
+        positions = corpus(5, args.seed, *args.size)
+        results = run(positions, min_time=0.05, max_depth=3, mcts_seconds=0.3)
+    else:
+        positions = corpus(20, args.seed, *args.size)
+        results = run(positions)
+    meta = {
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'seed': args.seed,
+        'quick': args.quick,
+        'size': args.size,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+    }
+    save(args.out, results, meta)
+    print(f'Results written to {args.out}')
+    if args.save_baseline:
+        save(args.baseline, results, meta)
+        print(f'Baseline written to {args.baseline}')
+    elif os.path.exists(args.baseline):
+        baseline, baseline_meta = load(args.baseline)
+        differ = mismatches(meta, baseline_meta)
+        if differ:
+            for key, old, new in differ:
+                print(f'Not comparing against {args.baseline}: it was run with {key} {old}, this run with {new}')
+            sys.exit(2)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, old, new, change in regressions:
+            print(f'REGRESSION {name}: {old:.2f} -> {new:.2f} ({100*change:.0f}% slower)')
+        if regressions:
+            sys.exit(1)
+        print(f'No regressions against {args.baseline} (tolerance {100*args.tolerance:.0f}%)')
+
+
+if __name__ == '__main__':
+    main()
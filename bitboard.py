@@ -0,0 +1,232 @@
+# Bitboard position for the Connect-4 project
+# The board is stored as two integer masks, one per player, plus the height of
+# every column. Cell (c, r) of the array board (b[c][r], r = 0 at the bottom)
+# is bit c*(rows+1) + r, so each column owns rows+1 bits and the extra top bit
+# is a sentinel that is never set. The sentinel keeps shifted lines from
+# wrapping into the next column, which makes every win check a handful of
+# shifts and ANDs no matter how full the board is.
+
+import random
+
+import numpy as np
+
+# Zobrist keys are drawn once per board shape from a fixed seed, so hashes are
+# stable across processes (and across runs for on-disk tables). Every shape
+# gets its own keys and a key of its own in every hash, so boards of
+# different sizes (even empty ones) do not share hashes in one table.
+ZOBRIST_SEED = 560
+zobrist_cache = {}
+
+
+# Random 64-bit keys for every (player, bit) of a board shape, one key that
+# is XORed in whenever player 2 is to move, and one in every hash of the shape.
+# Input: int c, r = board shape; the board uses c*(r+1) bits
+# Return: [int[][] keys, int side, int shape] keys[n-1][bit] for player n
+def zobrist_keys(c, r):
+    if (c, r) not in zobrist_cache:
+        rng = random.Random(f'{ZOBRIST_SEED}:{c}x{r}')
+        keys = [[rng.getrandbits(64) for _ in range(c * (r + 1))] for _ in range(2)]
+        zobrist_cache[(c, r)] = [keys, rng.getrandbits(64), rng.getrandbits(64)]
+    return zobrist_cache[(c, r)]
+
+
+# Check if the mask p holds w cells in a row along any of the given shifts.
+# Doubling the run length each step makes this O(log w) big-int operations.
+# Input: int p = mask of one player's pieces
+#        int w = connect #
+#        int[] shifts = bit distance between neighbours for each direction
+# Return: bool = True if p contains a line of w
+def connected(p, w, shifts):
+    for s in shifts:
+        m = p
+        run = 1
+        while run < w and m:
+            step = min(run, w - run)
+            m &= m >> (step * s)
+            run += step
+        if m:
+            return True
+    return False
+
+
+class Bitboard:
+    # Input: int c = number of columns
+    #        int r = number of rows
+    #        int w = connect #
+    #        int turn = player (1/2) who drops the next piece
+    def __init__(self, c=7, r=6, w=4, turn=1):
+        self.c = c
+        self.r = r
+        self.w = w
+        self.h = r + 1
+        # up, right, right-up, right-down
+        self.shifts = (1, self.h, self.h + 1, self.h - 1)
+        self.pieces = [0, 0]
+        self.heights = [0] * c
+        self.turn = turn
+        self.moves = []
+        # Zobrist hash of the pieces and the side to move, updated by play/undo
+        self.zobrist, self.side_key, shape_key = zobrist_keys(c, r)
+        self.hash = shape_key ^ (self.side_key if turn == 2 else 0)
+        # Hash of the left-right mirror of the board, see canonical_hash
+        self.mirror_hash = self.hash
+        # Game status, kept up to date by play/undo
+        # winner = 0 while the game is on, 1/2 for a win, 3 for a draw
+        self.winner = 0
+        # len(moves) when the game ended; undoing past it reopens the game
+        self.over_ply = None
+        # Number of cells still playable
+        self.free = c * r
+
+    # Build a bitboard from the array board used by main/agents.
+    # Input: int[][] b = board, indexed b[column][row]
+    #        int w = connect #
+    #        int turn = who moves next; guessed from the piece count if None
+    # Return: Bitboard
+    @classmethod
+    def from_array(cls, b, w=4, turn=None):
+        b = np.asarray(b)
+        [c, r] = np.shape(b)
+        pos = cls(c, r, w)
+        for n in (1, 2):
+            p = 0
+            for col, row in zip(*np.nonzero(b == n)):
+                bit = int(col) * pos.h + int(row)
+                p |= 1 << bit
+                pos.hash ^= pos.zobrist[n-1][bit]
+                pos.mirror_hash ^= pos.zobrist[n-1][(c-1-int(col)) * pos.h + int(row)]
+            pos.pieces[n-1] = p
+        # Same convention as helper.get_avalible_column: the lowest empty cell
+        empty = b == 0
+        pos.heights = [int(t) for t in np.where(np.any(empty, axis=1), np.argmax(empty, axis=1), r)]
+        if turn is None:
+            turn = 1 if np.count_nonzero(b == 1) == np.count_nonzero(b == 2) else 2
+        pos.set_turn(turn)
+        pos.free = sum(r - t for t in pos.heights)
+        pos.winner = pos.get_winner()
+        if pos.winner != 0:
+            pos.over_ply = 0
+        return pos
+
+    # Convert back to the np.zeros([c, r]) array layout.
+    # Return: int[][] b = board
+    def to_array(self):
+        nbytes = (self.c * self.h + 7) // 8
+        b = np.zeros([self.c, self.r], dtype=int)
+        for n in (1, 2):
+            bits = np.frombuffer(self.pieces[n-1].to_bytes(nbytes, 'little'), dtype=np.uint8)
+            bits = np.unpackbits(bits, bitorder='little')[:self.c * self.h]
+            b[bits.reshape(self.c, self.h)[:, :self.r] == 1] = n
+        return b
+
+    def copy(self):
+        pos = Bitboard.__new__(Bitboard)
+        pos.__dict__.update(self.__dict__)
+        pos.pieces = list(self.pieces)
+        pos.heights = list(self.heights)
+        pos.moves = list(self.moves)
+        return pos
+
+    def can_play(self, col):
+        return 0 <= col < self.c and self.heights[col] < self.r
+
+    # Return: int[] = playable columns, left to right
+    def legal_moves(self):
+        return [col for col in range(self.c) if self.heights[col] < self.r]
+
+    # Drop a piece for the player whose turn it is; no legality check.
+    # Only the mover can have completed a line, and any line of theirs not
+    # through this cell would already have ended the game, so the status
+    # update checks the mover's mask alone: O(log w) shifts per direction.
+    # Input: int col = which column to move
+    def play(self, col):
+        col = int(col)
+        n = self.turn
+        bit = col * self.h + self.heights[col]
+        self.pieces[n-1] |= 1 << bit
+        self.hash ^= self.zobrist[n-1][bit] ^ self.side_key
+        self.mirror_hash ^= self.zobrist[n-1][(self.c-1-col) * self.h + self.heights[col]] ^ self.side_key
+        self.heights[col] += 1
+        self.moves.append(col)
+        self.free -= 1
+        self.turn = 3 - n
+        if self.winner == 0:
+            if connected(self.pieces[n-1], self.w, self.shifts):
+                self.winner = n
+                self.over_ply = len(self.moves)
+            elif self.free == 0:
+                self.winner = 3
+                self.over_ply = len(self.moves)
+
+    # Hand the next move to player turn, keeping the hashes in step
+    def set_turn(self, turn):
+        if turn != self.turn:
+            self.hash ^= self.side_key
+            self.mirror_hash ^= self.side_key
+        self.turn = turn
+
+    # Take back the last move played.
+    def undo(self):
+        if len(self.moves) == self.over_ply:
+            self.winner = 0
+            self.over_ply = None
+        col = self.moves.pop()
+        self.free += 1
+        self.heights[col] -= 1
+        self.turn = 3 - self.turn
+        bit = col * self.h + self.heights[col]
+        self.pieces[self.turn-1] &= ~(1 << bit)
+        self.hash ^= self.zobrist[self.turn-1][bit] ^ self.side_key
+        self.mirror_hash ^= self.zobrist[self.turn-1][(self.c-1-col) * self.h + self.heights[col]] ^ self.side_key
+
+    # Return: bool = True if player n has w in a row
+    def is_win(self, n):
+        return connected(self.pieces[n-1], self.w, self.shifts)
+
+    # Return: bool = True if dropping into col wins for the player to move
+    def is_winning_move(self, col):
+        p = self.pieces[self.turn-1] | (1 << (col * self.h + self.heights[col]))
+        return connected(p, self.w, self.shifts)
+
+    def is_full(self):
+        return self.free == 0
+
+    def is_over(self):
+        return self.winner != 0
+
+    def is_draw(self):
+        return self.winner == 3
+
+    # Recompute the status from scratch; play/undo keep self.winner instead.
+    # Same return codes as helper.get_winner
+    # Return: int winner = 1 or 2 if that player is winning
+    #                      0 if noone is currently winning
+    #                      3 if the board is full AND noone is winning -> a draw
+    def get_winner(self):
+        for n in (1, 2):
+            if self.is_win(n):
+                return n
+        return 3 if self.is_full() else 0
+
+    # Return: (int, int) = uniquely identifies the position (without turn)
+    def key(self):
+        return (self.pieces[0], self.pieces[1])
+
+    # A board and its left-right mirror are the same position, with every
+    # column c played as c-1-c instead. Caches keyed by the canonical hash
+    # (the smaller of the two hashes) store one entry for both, with moves
+    # stored as seen on the canonical side, see canonical_move.
+    # Return: int = the same for this board and its mirror
+    def canonical_hash(self):
+        return min(self.hash, self.mirror_hash)
+
+    # Return: bool = True if the canonical side is the mirror of this board
+    def is_mirrored(self):
+        return self.mirror_hash < self.hash
+
+    # Translate a column between this board and its canonical side; the
+    # mapping is its own inverse, so it works both ways.
+    def canonical_move(self, col):
+        if col is not None and self.mirror_hash < self.hash:
+            return self.c - 1 - col
+        return col
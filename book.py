@@ -0,0 +1,146 @@
+# Opening book of the Connect-4 project
+# The best move of every position of the first few plies, as proven by
+# solver.py. A book is a .npy file of fixed-size records sorted by the
+# canonical hash of the position (side to move included, see
+# Bitboard.canonical_hash), so a position and its mirror share one record:
+#     key uint64, move int8, score int8    (10 bytes per position)
+# move is stored as seen on the canonical side.
+# It is memory-mapped on first use, so loading costs nothing until a lookup
+# is made and only the pages touched by the binary search are read.
+#
+# Build one with:  python book.py plies [seconds_per_position] [c r w]
+
+import os
+import sys
+import time
+
+import numpy as np
+
+from bitboard import Bitboard
+from search import SearchTimeout
+import solver
+
+RECORD = np.dtype([('key', '<u8'), ('move', 'i1'), ('score', 'i1')])
+
+
+# Where the book of a board shape lives: next to this file
+def book_path(c, r, w):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), f'book_{c}x{r}_{w}.npy')
+
+
+class OpeningBook:
+    # Input: str path = book file; a missing file is an empty book
+    def __init__(self, path):
+        self.path = path
+        self.records = None
+
+    def load(self):
+        if self.records is None:
+            if os.path.exists(self.path):
+                self.records = np.load(self.path, mmap_mode='r')
+            else:
+                self.records = np.zeros(0, dtype=RECORD)
+        return self.records
+
+    def __len__(self):
+        return len(self.load())
+
+    # Input: Bitboard pos = position with the side to move set
+    # Return: (int move, int score) as in solver.py, or None if not in the book
+    def probe(self, pos):
+        records = self.load()
+        if len(records) == 0:
+            return None
+        key = pos.canonical_hash()
+        i = int(np.searchsorted(records['key'], np.uint64(key)))
+        if i < len(records) and int(records['key'][i]) == key:
+            return pos.canonical_move(int(records['move'][i])), int(records['score'][i])
+        return None
+
+
+# One book per (c, r, w), opened on first use
+books = {}
+
+
+def get_book(c, r, w):
+    if (c, r, w) not in books:
+        books[(c, r, w)] = OpeningBook(book_path(c, r, w))
+    return books[(c, r, w)]
+
+
+# Book move of a position, if any
+# Input: Bitboard pos = position with the side to move set
+# Return: int column, or None
+def lookup(pos):
+    entry = get_book(pos.c, pos.r, pos.w).probe(pos)
+    if entry is None or not pos.can_play(entry[0]):
+        return None
+    return entry[0]
+
+
+# Every position reachable in at most plies moves whose game is not over,
+# one of each mirrored pair
+# Return: {int canonical hash: Bitboard pos}
+def positions(c, r, w, plies):
+    found = {}
+    pos = Bitboard(c, r, w)
+
+    def walk(pos):
+        if pos.canonical_hash() in found:
+            return
+        found[pos.canonical_hash()] = pos.copy()
+        if len(pos.moves) == plies:
+            return
+        for col in pos.legal_moves():
+            pos.play(col)
+            if pos.winner == 0:
+                walk(pos)
+            pos.undo()
+
+    walk(pos)
+    return found
+
+
+# Solve every position of the first plies moves and write them to a book.
+# Deeper positions are solved first; their results stay in the solver's
+# table and make the shallower ones cheaper. Positions not proven within
+# seconds are left out.
+# Input: int plies = book depth
+#        float seconds = time limit per position
+#        int c, r, w = board shape
+#        str path = output file; book_path(c, r, w) if None
+# Return: int = number of positions written
+def build_book(plies, seconds=60.0, c=7, r=6, w=4, path=None):
+    if path is None:
+        path = book_path(c, r, w)
+    todo = sorted(positions(c, r, w, plies).values(), key=lambda pos: -len(pos.moves))
+    s = solver.get_solver(c, r, w)
+    records = []
+    for k, pos in enumerate(todo):
+        try:
+            move, score = s.best_move(pos, time.time() + seconds)
+        except SearchTimeout:
+            print(f'{k+1}/{len(todo)}: {pos.moves} not solved in {seconds}s')
+            continue
+        records.append((pos.canonical_hash(), pos.canonical_move(move), score))
+        print(f'{k+1}/{len(todo)}: {pos.moves} -> {move} ({score})')
+    book = np.array(records, dtype=RECORD)
+    book.sort(order='key')
+    # Write to a temporary file first so a reader never sees half a book
+    tmp = path + '.tmp.npy'
+    np.save(tmp, book)
+    os.replace(tmp, path)
+    books.pop((c, r, w), None)
+    return len(book)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if not args:
+        print(f'usage: python {sys.argv[0]} plies [seconds_per_position] [c r w]')
+        sys.exit(1)
+    plies = int(args[0])
+    seconds = float(args[1]) if len(args) > 1 else 60.0
+    c, r, w = [int(a) for a in args[2:5]] if len(args) > 4 else (7, 6, 4)
+    n = build_book(plies, seconds, c, r, w)
+    print(f'Wrote {n} positions to {book_path(c, r, w)}')
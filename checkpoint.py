@@ -0,0 +1,77 @@
+# Checkpoints of long tournament runs
+# The games finished so far are kept in a JSON file, so a run that crashed or
+# was stopped can be resumed without playing them again. The file is replaced
+# atomically: written in full to a temporary file next to it, which is then
+# renamed over it, so a crash at any point leaves either the old checkpoint or
+# the new one, never half of one.
+
+import json
+import os
+import tempfile
+import time
+
+# Seconds between two checkpoints
+EVERY = 30.0
+
+
+# Input: str path = file to (over)write
+#        data = anything json can write
+def write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.tmp-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class Checkpoint:
+    # Input: str path = checkpoint file
+    #        dict config = settings of the run, of JSON types only; a checkpoint
+    #                      of a run with other settings is never resumed
+    #        float every = seconds between two checkpoints
+    def __init__(self, path, config, every=EVERY):
+        self.path = path
+        self.config = config
+        self.every = every
+        # Finished games, as lists given to add
+        self.games = []
+        # Anything else the run needs back on resume
+        self.state = {}
+        self.last_save = time.time()
+
+    # Read the checkpoint back.
+    # Return: bool = one was found
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data['config'] != self.config:
+            raise ValueError(f'Checkpoint {self.path} is of another run: {data["config"]}')
+        self.games = data['games']
+        self.state = data['state']
+        return True
+
+    # Input: list game = one finished game; saved with the next checkpoint
+    def add(self, game):
+        self.games.append(list(game))
+
+    # Save if the last checkpoint is more than every seconds old
+    def maybe_save(self):
+        if time.time() - self.last_save >= self.every:
+            self.save()
+
+    def save(self):
+        write_atomic(self.path, {'config': self.config, 'state': self.state, 'games': self.games})
+        self.last_save = time.time()
+
+    # Delete the checkpoint, once the run is over
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,98 @@
+# Memoized heuristic evaluation of the Connect-4 project
+# EvalCache wraps any heuristic h(b, n, w) and remembers its scores in a
+# bounded table with least-recently-used eviction. It is called like the
+# heuristic it wraps, so it can be handed to any agent in its place.
+
+import inspect
+from collections import OrderedDict
+
+import numpy as np
+
+import search
+
+# Default number of scores kept per cache
+EVAL_CACHE_SIZE = 1 << 16
+
+
+class EvalCache:
+    # Input: func h = the heuristic to memoize; a pure function of (b, n, w)
+    #        int size = most scores kept; the least recently used go first
+    def __init__(self, h, size=EVAL_CACHE_SIZE):
+        self.h = h
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.__name__ = getattr(h, '__name__', 'h')
+        # Mirrored boards share an entry if h scores them the same
+        self.symmetric = search.is_symmetric(h)
+        self.state = search.takes_state(h)
+        # The search passes pos (and state if h takes it), see search.takes_argument
+        params = [inspect.Parameter(a, inspect.Parameter.POSITIONAL_OR_KEYWORD) for a in ('b', 'n', 'w')]
+        for a in (('state', 'pos') if self.state else ('pos',)):
+            params.append(inspect.Parameter(a, inspect.Parameter.KEYWORD_ONLY, default=None))
+        self.__signature__ = inspect.Signature(params)
+
+    # Input: int[][] b = board; may be None if pos is given
+    #        int n = the ID for the agent to score for
+    #        int w = connect #
+    #        lines.LineState state = passed on to h on a miss, if h takes it
+    #        Bitboard pos = the same position as b; its hash is used as the key
+    # Return: the score of h
+    def __call__(self, b, n, w, state=None, pos=None):
+        if pos is not None:
+            # Hashes are per board shape, see bitboard.zobrist_keys; the shape
+            # is in the key as well, so a hash collision cannot cross sizes
+            key = (pos.c, pos.r, pos.canonical_hash() if self.symmetric else pos.hash, n, w)
+        else:
+            b = np.asarray(b)
+            cells = b.astype(np.int8).tobytes()
+            if self.symmetric:
+                cells = min(cells, b[::-1].astype(np.int8).tobytes())
+            key = (b.shape, cells, n, w)
+        entries = self.entries
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entries[key]
+        self.misses += 1
+        if state is not None and self.state:
+            value = self.h(None, n, w, state=state)
+        else:
+            if b is None:
+                b = pos.to_array()
+            value = self.h(b, n, w)
+        entries[key] = value
+        if len(entries) > self.size:
+            entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    # Return: float = share of calls answered from the cache
+    def hit_rate(self):
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.0
+
+
+# One cache per heuristic, kept for the whole process so it is shared by
+# every agent using that heuristic, across moves and games
+caches = {}
+
+
+# Input: func h = heuristic to memoize
+# Return: EvalCache of h
+def get_cache(h, size=EVAL_CACHE_SIZE):
+    if isinstance(h, EvalCache):
+        return h
+    if h not in caches:
+        caches[h] = EvalCache(h, size)
+    return caches[h]
+
+
+# Return: {str name: (int hits, int misses)} of every cache in this process
+def stats():
+    return {cache.__name__: (cache.hits, cache.misses) for cache in caches.values()}
@@ -0,0 +1,149 @@
+# Headless game engine of the Connect-4 project
+# Plays agents against each other without printing, prompting or writing
+# files, and returns what happened as a GameResult. main.py is the command
+# line host on top of this.
+# Agents are called as algo(board, who_goes_next, w, heuristic, max_depth), see agents.py.
+
+import time
+
+import numpy as np
+
+import helper
+import stats
+from bitboard import Bitboard
+
+
+# Board size, connect # and the d passed to the agents
+# collect_stats = have the agents fill in a stats.SearchStats on every move
+class GameConfig:
+    def __init__(self, c=7, r=6, w=4, max_depth=5, collect_stats=False):
+        self.c = c
+        self.r = r
+        self.w = w
+        self.max_depth = max_depth
+        self.collect_stats = collect_stats
+
+
+# What happened in one game
+class GameResult:
+    def __init__(self, moves, move_times, winner, board, elapsed, stats=None, move_stats=None):
+        # int[] = columns played, in order
+        self.moves = moves
+        # float[] = seconds each agent took to choose the move at the same index
+        self.move_times = move_times
+        # int = 1/2 for the winning agent, 3 for a draw
+        self.winner = winner
+        # int[][] = the final board
+        self.board = board
+        # float = seconds for the whole game
+        self.elapsed = elapsed
+        # [SearchStats, SearchStats] = work of agent 1 and 2 over the game,
+        # None unless config.collect_stats
+        self.stats = stats
+        # SearchStats[] = work of each move, at the same index as moves
+        self.move_stats = move_stats
+
+
+class Game:
+    # Input: func agent1, h1 = agent who goes first and its heuristic
+    #        func agent2, h2 = agent who goes second and its heuristic
+    #        GameConfig config = defaults to a 7x6 connect 4 with d = 5
+    def __init__(self, agent1, h1, agent2, h2, config=None):
+        if config is None:
+            config = GameConfig()
+        self.config = config
+        self.agents = [agent1, agent2]
+        self.heuristics = [h1, h2]
+        self.board = np.zeros([config.c, config.r], dtype=int)
+        # Tracks game over / winner / draw as moves are made
+        self.state = Bitboard(config.c, config.r, config.w)
+        # which agent is playing
+        self.next = 1
+        self.moves = []
+        self.move_times = []
+        self.stats = None
+        self.move_stats = None
+        if config.collect_stats:
+            self.stats = [stats.SearchStats(), stats.SearchStats()]
+            self.move_stats = []
+        self.start_time = time.time()
+
+    @property
+    def winner(self):
+        return self.state.winner
+
+    def is_over(self):
+        return self.state.winner != 0
+
+    # Call the agent whose turn it is.
+    # Return: whatever the agent returned; a column for every agent but
+    #         agent_user, which may also return a backtrack request
+    def ask(self):
+        n = self.next
+        st = None
+        if self.stats is not None:
+            st = stats.SearchStats()
+            previous = stats.collect(st)
+        start = time.time()
+        try:
+            move = self.agents[n-1](self.board, n, self.config.w, self.heuristics[n-1], self.config.max_depth)
+        finally:
+            if st is not None:
+                stats.collect(previous)
+        seconds = time.time() - start
+        self.move_times.append(seconds)
+        if st is not None:
+            st.move(seconds)
+            self.stats[n-1].merge(st)
+            self.move_stats.append(st)
+        return move
+
+    # Play a column for the agent whose turn it is; raise ValueError if illegal
+    def play(self, move):
+        if len(self.move_times) == len(self.moves):
+            # Not chosen through ask
+            self.move_times.append(0.0)
+            if self.move_stats is not None:
+                self.move_stats.append(stats.SearchStats())
+        self.board = helper.make_move(self.board, self.next, move)
+        self.state.play(move)
+        self.moves.append(int(move))
+        # Flip between agent 1 and 2
+        self.next = 3 - self.next
+
+    def step(self):
+        move = self.ask()
+        self.play(move)
+        return move
+
+    # Take back the top pieces of columns j and k, see helper.backtrack
+    # The same agent is asked again afterwards.
+    def backtrack(self, j, k):
+        self.board = helper.backtrack(self.board, j, k)
+        self.state = Bitboard.from_array(self.board, self.config.w)
+        for col in (j, k):
+            if col in self.moves:
+                del self.moves[len(self.moves) - 1 - self.moves[::-1].index(col)]
+        self.move_times = self.move_times[:len(self.moves)]
+        if self.move_stats is not None:
+            self.move_stats = self.move_stats[:len(self.moves)]
+
+    # Return: GameResult so far
+    def result(self):
+        move_stats = list(self.move_stats) if self.move_stats is not None else None
+        return GameResult(list(self.moves), list(self.move_times), self.state.winner, self.board.copy(), time.time() - self.start_time, self.stats, move_stats)
+
+    # Play until someone wins or the board is full.
+    # Return: GameResult
+    def run(self):
+        while not self.is_over():
+            self.step()
+        return self.result()
+
+
+# Play one game between two agents.
+# Input: func agent1, h1, agent2, h2 = agents and their heuristics; agent1 goes first
+#        GameConfig config
+# Return: GameResult
+def play_game(agent1, h1, agent2, h2, config=None):
+    return Game(agent1, h1, agent2, h2, config).run()
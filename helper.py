@@ -1,10 +1,12 @@
 # Helper functions
+# colorama and openpyxl are imported by the functions that use them, so that
+# headless processes (e.g. tournament workers) never load them.
 
 import os
 import numpy as np
 import random
-from colorama import Fore, Style
-from openpyxl import Workbook, load_workbook
+
+from bitboard import Bitboard
 
 # Provide check for legal moves and top avalible row. 
 # Input: int[][] b = board
@@ -14,22 +16,15 @@ from openpyxl import Workbook, load_workbook
 #         int[] t  = int array indicating the top avalible row for
 #                    each column. -1 if that column is full (illegal). 
 def get_avalible_column(b):
-    [n, m] = np.shape(np.array(b))
-    l = []
-    t = []
-    for c in range(0, n):
-        l.append(False)
-        t.append(-1)
-        for r in range(0, m):
-            if b[c][r] == 0:
-                l[-1] = True
-                t[-1] = r
-                break
-    return np.array(l, dtype=bool), np.array(t, dtype=int)
+    empty = np.asarray(b) == 0
+    l = np.any(empty, axis=1)
+    t = np.where(l, np.argmax(empty, axis=1), -1)
+    return l, t.astype(int)
 
 # Print the board
 # Input: int[][] b = board
 def print_board(b):
+    from colorama import Fore, Style
     [n, m] = np.shape(np.array(b))
     for r in range(m-1, -1, -1):
         for c in range(0, n):
@@ -71,60 +66,56 @@ def backtrack(b, j, k):
     return b
 
 # return 0 for no winner, 1/2 for respective winner
-# evaled from 1) bot to top, then 2) left to right
-# if there are more than 1 winner on board(idk how), return the 1st discovered winner
+# evaled on the bitboard, see bitboard.py
+# if there are more than 1 winner on board(idk how), player 1 is returned
 # Input: int[][] b = borad
 #        int w = connect #
 # Return: int winner = 1 or 2 if that player is winning
 #                      0 if noone is currently winning
 #                      3 if the board is full AND noone is winning -> a draw
 def get_winner(b, w):
-    [n, m] = np.shape(np.array(b))
-    for c in range(0, n):
-        for r in range(0, m):
-            if b[c][r] == 0:
-                continue
-            # check in sequence: up->right->right-up->right-down
-            conn = [1, 1, 1, 1]
-            #up
-            for rr in range(r+1, m):
-                if (b[c][rr] == b[c][r]):
-                    conn[0] = conn[0]+1
-                else:
-                    break
-            #right
-            for rr in range(c+1, n):
-                if (b[rr][r] == b[c][r]):
-                    conn[1] = conn[1]+1
-                else:
-                    break
-            #right-up
-            for rr in range(1, min(n-c, m-r)):
-                if (b[c+rr][r+rr] == b[c][r]):
-                    conn[2] = conn[2]+1
-                else:
-                    break
-            #right-down
-            for rr in range(1, min(n-c, r+1)):
-                if (b[c+rr][r-rr] == b[c][r]):
-                    conn[3] = conn[3]+1
-                else:
-                    break
-            # if win, return winner
-            for k in conn:
-                if k == w:
-                    return b[c][r]
-                
-    # potential draw -> check if full board
-    l, t = get_avalible_column(b)
-    if (np.any(l)):
-        # no winner, not full board, return 0
-        return 0
+    return Bitboard.from_array(b, w).get_winner()
+
+# Column headers of the game and tournament workbooks
+GAME_HEADERS = ["Agent 1", "Agent 2", "Winner", "Match Time", "Heuristic 1", "Heuristic 2", "Final Board", "Depth"]
+TOURNAMENT_HEADERS = ["Agent 1", "Agent 2", "Winrate", "Average Match Time", "Heuristic 1", "Heuristic 2", "Depth"]
+
+# Build the row recorded for one game, or for one pair if tournament.
+# Same arguments as record_to_excel
+# Return: list row = one value per header
+def result_row(agent1, agent2, winner, match_time, heuristic_1, heuristic_2, final_board, depth, tournament=False):
+    if not tournament:
+        # Convert final_board to a string
+        final_board_str = '\n'.join([' '.join(map(str, row)) for row in final_board])
+        return [agent1, agent2, winner, match_time, heuristic_1, heuristic_2, final_board_str, depth]
     else:
-        # full board, no winner, draw -> return 3
-        return 3
+        return [agent1, agent2, winner, match_time, heuristic_1, heuristic_2, depth]
+
+# Append rows to an excel file, opening and saving it once.
+# Input: str file_name = the workbook, created with headers if missing
+#        str[] headers = column headers of a new workbook
+#        list[] rows = rows to append
+def append_rows_to_excel(file_name, headers, rows):
+    from openpyxl import Workbook, load_workbook
+    # Check if the file exists
+    if os.path.exists(file_name):
+        wb = load_workbook(file_name)
+        ws = wb.active
+    else:
+        # If not, create a new workbook if the file doesn't exist
+        wb = Workbook()
+        ws = wb.active
+        # Define column headers for the new file
+        for col, header in enumerate(headers, start=1):
+            ws.cell(row=1, column=col, value=header)
+    for row in rows:
+        ws.append(row)
+    # Save the workbook
+    wb.save(file_name)
 
 # Output the result of a game to an excel file. 
+# This rewrites the whole workbook; to record many games use results.ResultsSink
+# and export once at the end.
 # Example output:
 # agent1 = "Agent 1"
 # agent2 = "Agent 2"
@@ -140,49 +131,18 @@ def get_winner(b, w):
 def record_to_excel(agent1, agent2, winner, match_time, heuristic_1, heuristic_2, final_board, depth, tournament=False):
     if not tournament:
         file_name = "game_data.xlsx"
-        headers = ["Agent 1", "Agent 2", "Winner", "Match Time", "Heuristic 1", "Heuristic 2", "Final Board", "Depth"]
+        headers = GAME_HEADERS
     else:
         file_name = "game_data_tournament.xlsx"
-        headers = ["Agent 1", "Agent 2", "Winrate", "Average Match Time", "Heuristic 1", "Heuristic 2", "Depth"]
-        
-    # Check if the file exists
-    if os.path.exists(file_name):
-        wb = load_workbook(file_name)
-        ws = wb.active
-    else:
-        # If not, create a new workbook if the file doesn't exist
-        wb = Workbook()
-        ws = wb.active
-        # Define column headers for the new file
-        for col, header in enumerate(headers, start=1):
-            ws.cell(row=1, column=col, value=header)
-
-    if not tournament:
-        # Convert final_board to a string
-        final_board_str = '\n'.join([' '.join(map(str, row)) for row in final_board])
-        # Append data to the next row
-        row_data = [agent1, agent2, winner, match_time, heuristic_1, heuristic_2, final_board_str, depth]
-        ws.append(row_data)
-    else:
-        # Append data to the next row
-        row_data = [agent1, agent2, winner, match_time, heuristic_1, heuristic_2, depth]
-        ws.append(row_data)
-    
-    # Save the workbook
-    wb.save(file_name)
+        headers = TOURNAMENT_HEADERS
+    row_data = result_row(agent1, agent2, winner, match_time, heuristic_1, heuristic_2, final_board, depth, tournament)
+    append_rows_to_excel(file_name, headers, [row_data])
     if not tournament:
         print(f"Data appended to {file_name}")
 
 # Helper for mcts: simulate a random game based on given board
 def simulate_random_playout(b, n, w):
-    current_player = n
-    while True:
-        result = get_winner(b, w)
-        if result != 0:  # If game is over
-            return result
-        legal_moves = [col for col, is_legal in enumerate(get_avalible_column(b)[0]) if is_legal]
-        if not legal_moves:  # No legal moves means a draw
-            return 0
-        move = random.choice(legal_moves)
-        b = make_move(b, current_player, move)
-        current_player = 3 - current_player  # Switch player
+    pos = Bitboard.from_array(b, w, turn=n)
+    while pos.winner == 0:
+        pos.play(random.choice(pos.legal_moves()))
+    return pos.winner
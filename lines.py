@@ -0,0 +1,251 @@
+# Precomputed index of every line of w cells on a c x r board
+# Heuristics gather all lines with one fancy-indexing step and reduce them with
+# NumPy instead of walking the board cell by cell.
+
+import numpy as np
+
+# up, right, right-up, right-down; same order as helper.get_winner used to scan
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+class LineIndex:
+    # Input: int c = number of columns
+    #        int r = number of rows
+    #        int w = connect #
+    def __init__(self, c, r, w):
+        self.c = c
+        self.r = r
+        self.w = w
+        cells = []
+        direction = []
+        # Lines are listed by their first cell (column, then row), then by
+        # direction; the first cell of a line is where it starts, as in
+        # h_sliding_windows
+        for col in range(c):
+            for row in range(r):
+                for d, (dc, dr) in enumerate(DIRECTIONS):
+                    if 0 <= col + dc*(w-1) < c and 0 <= row + dr*(w-1) < r:
+                        cells.append([(col + dc*i) * r + (row + dr*i) for i in range(w)])
+                        direction.append(d)
+        # cells[l] = flat indexes into b.reshape(c*r) of the cells of line l
+        self.cells = np.array(cells, dtype=np.intp).reshape(-1, w)
+        self.direction = np.array(direction, dtype=np.int8)
+        # A line is also encoded as a base-3 number, cell i of the line being digit i
+        self.pow3 = 3 ** np.arange(w)
+        # through[k] = [(line, 3^i), ...] for every line with cell k at position i
+        self.through = [[] for _ in range(c * r)]
+        for l, line in enumerate(cells):
+            for i, k in enumerate(line):
+                self.through[k].append((l, 3 ** i))
+
+    def __len__(self):
+        return len(self.cells)
+
+    # Input: int[][] b = board, or a stack of boards with shape [N, c, r]
+    # Return: int[..., L, w] = the values on every line
+    def values(self, b):
+        b = np.asarray(b)
+        return b.reshape(b.shape[:-2] + (self.c * self.r,))[..., self.cells]
+
+    # Input: int[][] b = board, or a stack of boards with shape [N, c, r]
+    # Return: int[..., L] = the base-3 code of every line
+    def codes(self, b):
+        return self.values(b) @ self.pow3
+
+
+# LineIndex per (c, r, w), built on first use
+indexes = {}
+
+
+def get_index(c, r, w):
+    if (c, r, w) not in indexes:
+        indexes[(c, r, w)] = LineIndex(c, r, w)
+    return indexes[(c, r, w)]
+
+
+# Score of h_sliding_windows for one board or a whole stack of boards.
+# A line only counts if its first cell is taken, as in the original scan.
+# Input: int[][] b = board, or boards with shape [N, c, r]
+#        int n = the ID for the agent to score for
+#        int w = connect #
+# Return: int score, or int[N] scores for a stack of boards
+def sliding_windows_score(b, n, w=4):
+    b = np.asarray(b)
+    [c, r] = b.shape[-2:]
+    v = get_index(c, r, w).values(b)
+    mine = np.count_nonzero(v == n, axis=-1)
+    theirs = np.count_nonzero(v == int(n==1)+1, axis=-1)
+    empty = np.count_nonzero(v == 0, axis=-1)
+    # Prioritise a winning move, then connecting w-1, then connecting w-2
+    score = np.where(mine == w, 1000, np.where((mine == w-1) & (empty == 1), 5, np.where((mine == w-2) & (empty == 2), 2, 0)))
+    # Prioritise blocking an opponent's winning move (but not over bot winning)
+    score = score - 500 * ((theirs == w-1) & (empty == 1))
+    score = np.sum(score * (v[..., 0] != 0), axis=-1)
+    if b.ndim == 2:
+        return int(score)
+    return score
+
+
+# Empty cells where a piece of player p would complete a line of w, found
+# from the per-line counts in one pass: a line with w-1 pieces of p and one
+# empty cell is completed by that cell. The cell need not be playable yet.
+# Input: int[][] b = board
+#        int p = the player to look for
+#        int w = connect #
+# Return: (bool won, int[] cells) won = p already has a line of w
+#         cells = the completing cells, as flat indexes col*r + row
+def winning_cells(b, p, w):
+    b = np.asarray(b)
+    [c, r] = b.shape
+    index = get_index(c, r, w)
+    v = index.values(b)
+    mine = np.count_nonzero(v == p, axis=-1)
+    empty = np.count_nonzero(v == 0, axis=-1)
+    won = bool(np.any(mine == w))
+    open_lines = (mine == w-1) & (empty == 1)
+    cells = index.cells[open_lines][v[open_lines] == 0]
+    return won, np.unique(cells)
+
+
+# Per-line scores of the line-based heuristics
+# Input: int[] v = the values on one line
+#        int n = the ID for the agent to score for
+#        int w = connect #
+#        int d = direction of the line, index into DIRECTIONS
+# Return: int score of that line
+
+# h_sliding_windows
+def sliding_windows_line(v, n, w, d):
+    if v[0] == 0:
+        return 0
+    mine = v.count(n)
+    empty = v.count(0)
+    score = 0
+    if mine == w:
+        score += 1000
+    elif mine == w-1 and empty == 1:
+        score += 5
+    elif mine == w-2 and empty == 2:
+        score += 2
+    if v.count(int(n==1)+1) == w-1 and empty == 1:
+        score -= 500
+    return score
+
+
+# Count runs of exactly seq_len pieces of player in a line
+def count_seq(v, player, seq_len):
+    count = 0
+    potential_seq = 0
+    for each in v:
+        if each == player:
+            potential_seq += 1
+        else:
+            if potential_seq == seq_len:
+                count += 1
+            potential_seq = 0
+    if potential_seq == seq_len:
+        count += 1
+    return count
+
+
+# h_offense; vertical lines weigh their w-1 runs twice instead of their w-2 runs
+def offense_line(v, n, w, d):
+    if 0 not in v:
+        return 0
+    if d == 0:
+        return count_seq(v, n, w-1) * 15
+    return count_seq(v, n, w-1) * 10 + count_seq(v, n, w-2) * 5
+
+
+# h_defense
+def defense_line(v, n, w, d):
+    if v.count(int(n==1)+1) == w-1 and v.count(0) == 1:
+        return -10
+    return 0
+
+
+# Score of every possible line code, per direction, built on first use
+# tables[(f, n, w)][d][code] = f(line decoded from code, n, w, d)
+tables = {}
+
+
+def get_table(f, n, w):
+    if (f, n, w) not in tables:
+        table = []
+        for d in range(len(DIRECTIONS)):
+            row = []
+            for code in range(3 ** w):
+                v = [(code // 3 ** i) % 3 for i in range(w)]
+                row.append(f(v, n, w, d))
+            table.append(row)
+        tables[(f, n, w)] = np.array(table, dtype=np.int64).reshape(len(DIRECTIONS), 3 ** w)
+    return tables[(f, n, w)]
+
+
+# Sum of a per-line score over every line of a board, by table lookup.
+# Input: int[][] b = board, or boards with shape [N, c, r]
+#        func f = per-line score, e.g. offense_line
+#        int n = the ID for the agent to score for
+#        int w = connect #
+# Return: int score, or int[N] scores for a stack of boards
+def line_score(b, f, n, w):
+    b = np.asarray(b)
+    [c, r] = b.shape[-2:]
+    index = get_index(c, r, w)
+    score = np.sum(get_table(f, n, w)[index.direction, index.codes(b)], axis=-1)
+    if b.ndim == 2:
+        return int(score)
+    return score
+
+
+# Line codes of one board kept up to date move by move, so that line-based
+# heuristics are read off running totals instead of rescanning the board.
+# play/undo touch only the lines through the cell that changed.
+class LineState:
+    # Input: int[][] b = the board to start from
+    #        int w = connect #
+    def __init__(self, b, w):
+        b = np.asarray(b)
+        [c, r] = b.shape
+        self.r = r
+        self.w = w
+        self.index = get_index(c, r, w)
+        self.codes = self.index.codes(b).tolist()
+        # Running totals of the per-line scores asked for so far
+        # keys[(f, n)] = position in totals and line_tables
+        self.keys = {}
+        self.totals = []
+        # line_tables[t][l] = score table of line l for total t
+        self.line_tables = []
+
+    # Input: int col, int row = the cell that changed
+    #        int p = the piece put there (1/2); negative to take it away
+    def update(self, col, row, p):
+        codes = self.codes
+        for l, weight in self.index.through[col * self.r + row]:
+            old = codes[l]
+            new = old + p * weight
+            codes[l] = new
+            for t, line_table in enumerate(self.line_tables):
+                table = line_table[l]
+                self.totals[t] += table[new] - table[old]
+
+    def play(self, col, row, p):
+        self.update(col, row, p)
+
+    def undo(self, col, row, p):
+        self.update(col, row, -p)
+
+    # Input: func f = per-line score, e.g. offense_line
+    #        int n = the ID for the agent to score for
+    # Return: int = sum of f over every line of the current board
+    def total(self, f, n):
+        if (f, n) not in self.keys:
+            # Lines of the same direction share one row of the table, so this
+            # stays small for long lines (3^w codes each) on large boards
+            rows = get_table(f, n, self.w).tolist()
+            by_line = [rows[d] for d in self.index.direction.tolist()]
+            self.keys[(f, n)] = len(self.totals)
+            self.totals.append(sum(row[code] for row, code in zip(by_line, self.codes)))
+            self.line_tables.append(by_line)
+        return self.totals[self.keys[(f, n)]]
@@ -8,19 +8,43 @@
 #   Try to make legal moves; if not, the host will ask again; if the same
 #   agent produces illegal moves more than # times total, they will be marked as lost.
 
-import time
+# The games themselves are played by game.Game; this file only handles the
+# prompts, printing and recording, and has no side effects on import.
+
 import numpy as np
-from inspect import getmembers, isfunction
 import os
-os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
 import agents
+import evalcache
+import game
 import helper
 import heuristics
+import results
+import schedule
+import tournament as tournament_runner
+
+# Ask for an index into names until a valid one is given
+# Input: str prompt = the question
+#        str[] names = the choices
+#        str kind = what is chosen, for the error message
+# Return: int i = the chosen index
+def select(prompt, names, kind):
+    while (True):
+        i = input(f'{prompt}: {names}\n')
+        if i == '':
+            continue
+        i = int(i)
+        if (i < 0 or i >= len(names)):
+            print(f'Invalid {kind} id {i}, try again')
+            continue
+        return i
 
 # Game host
 def main():
-    # define size of board; column by row
+    # Output files are written next to this file
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    # define size of board; column by row. Any size works, e.g. 9x7 with w = 5
+    # or 12x10 with w = 6
     c = 7; r = 6
     # w = win by connect #; max_depth = max_depth for agents
     w = 4; max_depth = 5
@@ -31,197 +55,123 @@ def main():
     # Enumerate through all combanitions of agents and heuristics
     # How many games to play per pair of agent-heuristic
     tournament = False; games_per_pair = 100
+    # Stop a pair early once its winrate is settled, playing at most
+    # games_per_pair games, see schedule.py
+    adaptive = True
+    # Rate the players from rated_games games between the most informative
+    # pairs instead of playing every pair, see ratings.py
+    rated = False; rated_games = 1000
+    # Keep the finished games of a tournament in this file, and carry on from
+    # it if the last run was cut short; None to not checkpoint
+    checkpoint_path = "tournament_checkpoint.json"; resume = True
+    # Worker processes for tournament mode; None = one per core
+    workers = None
+    # Memoize heuristic scores across moves and games, see evalcache.py
+    eval_cache = False
+    # Print what each agent's search did per game (or per pair), see stats.py
+    collect_stats = False
+    # All agents and heuristics, see the registries at the bottom of agents.py and heuristics.py
+    agent_list = list(agents.AGENTS.items())
+    heuristics_list = list(heuristics.HEURISTICS.items())
     if tournament:
-        forever = True
-        # Helper for recording the current index of the agent/heuristic
-        # tournament_index[0:1] is player 1, tournament_index[0] is their agent,
-        #     tournament_index[1] is their heuristic
-        tournament_index = [0, 0, 0, 0]
-    # Parse all agents into a dict.
-    agent_list = getmembers(agents, isfunction)
-    # Parse all heuristics into a dict.
-    heuristics_list = getmembers(heuristics, isfunction)
-    if tournament:
-        # Remove agent: user, random
-        index = 0
-        while (index < len(agent_list)):
-            if agent_list[index][0] == 'agent_user' or agent_list[index][0] == 'agent_random':
-                agent_list.remove(agent_list[index])
-                continue
-            index = index+1
+        # Remove agent: user, random; and the parallel ones, as every
+        # tournament worker would run them serially anyway, see parallel.in_worker
+        agent_list = [a for a in agent_list if a[0] not in ('agent_user', 'agent_random', 'agent_minimax_parallel', 'agent_mcts_parallel')]
         # Remove heuristics: zero
-        index = 0
-        while (index < len(heuristics_list)):
-            if heuristics_list[index][0] == 'h_zero':
-                heuristics_list.remove(heuristics_list[index])
-                continue
-            index = index+1
+        heuristics_list = [a for a in heuristics_list if a[0] != 'h_zero']
     
     # Parse names and function calls
     agent_names = [a[0] for a in agent_list]
     agent_funcs = [a[1] for a in agent_list]
     heuristics_names = [a[0] for a in heuristics_list]
     heuristics_funcs = [a[1] for a in heuristics_list]
+    if eval_cache:
+        heuristics_funcs = [evalcache.get_cache(h) for h in heuristics_funcs]
 
     print("Welcome to Connect-4!")
-    players = []
-    their_heuristics = []
     if tournament:
-        # Tournament mode
+        # Tournament mode: games are spread over a process pool, see tournament.py
         print("Running tournament mode...")
         print(f"Agents: {agent_names}; count: {len(agent_names)}")
         print(f"Heuristics: {heuristics_names}; count: {len(heuristics_names)}")
-        players = [0, 0]
-        their_heuristics = [0, 0]
-        current_pair_game_count = 0
-        pair_accumulated_time = 0.0
-    else:
-        while (True):
-            i = input(f'Please select agent 1 (who goes first): {agent_names}\n')
-            if i == '':
-                continue
-            i = int(i)
-            if (i < 0 or i >= len(agent_names)):
-                print(f'Invalid player id {i}, try again')
-                continue
-            else:
-                print(f'Agent 1 is {agent_names[i]}')
-                players.append(i)
-                break
-        while (True):
-            i = input(f'Please select heuristic for agent 1 {agent_names[players[0]]}: {heuristics_names}\n')
-            if i == '':
-                continue
-            i = int(i)
-            if (i < 0 or i >= len(heuristics_names)):
-                print(f'Invalid heuristic id {i}, try again')
-                continue
-            else:
-                print(f'Agent 1 is now using {heuristics_names[i]}')
-                their_heuristics.append(i)
-                break
-        while (True):
-            i = input(f'Please select agent 2 (who goes second): {agent_names}\n')
-            if i == '':
-                continue
-            i = int(i)
-            if (i < 0 or i >= len(agent_names)):
-                print(f'Invalid agent id {i}, try again')
-                continue
-            else:
-                print(f'Agent 2 is {agent_names[i]}')
-                players.append(i)
-                break
+        pair_stats = {} if collect_stats else None
+        if rated:
+            rating = tournament_runner.run_rated(agent_names, heuristics_names, c, r, w, max_depth, rated_games, workers, eval_cache=eval_cache)
+            print(rating.summary())
+            return
+        adaptive_schedule = schedule.AdaptiveSchedule(games_per_pair) if adaptive else None
+        tournament_runner.run_tournament(agent_names, heuristics_names, c, r, w, max_depth, games_per_pair, workers, eval_cache=eval_cache, pair_stats=pair_stats, adaptive=adaptive_schedule, checkpoint_path=checkpoint_path, resume=resume)
+        return
+
+    players = []
+    their_heuristics = []
+    players.append(select('Please select agent 1 (who goes first)', agent_names, 'agent'))
+    print(f'Agent 1 is {agent_names[players[0]]}')
+    their_heuristics.append(select(f'Please select heuristic for agent 1 {agent_names[players[0]]}', heuristics_names, 'heuristic'))
+    print(f'Agent 1 is now using {heuristics_names[their_heuristics[0]]}')
+    players.append(select('Please select agent 2 (who goes second)', agent_names, 'agent'))
+    print(f'Agent 2 is {agent_names[players[1]]}')
+    their_heuristics.append(select(f'Please select heuristic for agent 2 {agent_names[players[1]]}', heuristics_names, 'heuristic'))
+    print(f'Agent 2 is now using {heuristics_names[their_heuristics[1]]}')
+
+    config = game.GameConfig(c, r, w, max_depth, collect_stats)
+    # Games are buffered in game_data.jsonl, see results.py
+    sink = results.ResultsSink("game_data.jsonl", helper.GAME_HEADERS)
+    try:
         while (True):
-            i = input(f'Please select heuristic for agent 2 {agent_names[players[1]]}: {heuristics_names}\n')
-            if i == '':
-                continue
-            i = int(i)
-            if (i < 0 or i >= len(heuristics_names)):
-                print(f'Invalid heuristic id {i}, try again')
-                continue
+            g = game.Game(agent_funcs[players[0]], heuristics_funcs[their_heuristics[0]], agent_funcs[players[1]], heuristics_funcs[their_heuristics[1]], config)
+            helper.print_board(g.board)
+            # Game loop
+            while not g.is_over():
+                # Call an agent and get their move
+                next = g.next
+                move = g.ask()
+
+                # Backtrack from user
+                # syntex: b j k
+                #           j and k are the columns for the player and agent moves to be backtracked
+                if not(type(move) == int):
+                    move = list(move)
+                    g.backtrack(np.int32(move[2]), np.int32(move[4]))
+                    print(f'Performed backtracking on column {np.int32(move[2])} and {np.int32(move[4])}. ')
+                    helper.print_board(g.board)
+                    continue
+
+                # Print the move
+                g.play(move)
+                print(f'Agent {next}: {agent_names[players[next-1]]}|{heuristics_names[their_heuristics[next-1]]} plays: {move}')
+                helper.print_board(g.board)
+
+            result = g.result()
+            winner = result.winner
+            if (winner !=3):
+                # there is a winner!
+                print(f'Winner is agent {winner}: {agent_names[players[winner-1]]}')
             else:
-                print(f'Agent 2 is now using {heuristics_names[i]}')
-                their_heuristics.append(i)
-                break
-    # Initialize board
-    board = np.zeros([c, r], dtype=int)
-    if not tournament:
-        helper.print_board(board)
-    #Start Game timer
-    start_time = time.time()
-    # which agent is playing
-    # mismatch the index in players[next-1] 
-    next = 1
-    # Game loop
-    while (True):
-        # Call an agent and get their move
-        move = agent_funcs[players[next-1]](board, next, w, heuristics_funcs[their_heuristics[next-1]], max_depth)
-        
-        # Backtrack from user
-        # syntex: b j k
-        #           j and k are the columns for the player and agent moves to be backtracked
-        if not tournament and not(type(move) == int):
-            move = list(move)
-            board = helper.backtrack(board, np.int32(move[2]), np.int32(move[4]))
-            print(f'Performed backtracking on column {np.int32(move[2])} and {np.int32(move[4])}. ')
-            helper.print_board(board)
-            continue
-        
-        # Print the move
-        board = helper.make_move(board, next, move)
-        if not tournament:
-            print(f'Agent {next}: {agent_names[players[next-1]]}|{heuristics_names[their_heuristics[next-1]]} plays: {move}')
-            helper.print_board(board)
+                # this game is a draw
+                print(f'This game is a DRAW!')
+            if result.stats is not None:
+                for k, s in enumerate(result.stats):
+                    print(f'Agent {k+1} search: {s.summary()}')
+            # Grab game time
+            elapsed_time_str = "{:.4f}".format(result.elapsed)
+            #Record the winner; the excel sheet is written once the games are over
+            sink.add(helper.result_row(agent_names[players[0]], agent_names[players[1]], winner, elapsed_time_str, heuristics_names[their_heuristics[0]], heuristics_names[their_heuristics[1]], result.board, max_depth))
 
-        # Eval for winner
-        winner = helper.get_winner(board, w)
-        if winner != 0:
-            if not tournament:
-                if (winner !=3):
-                    # there is a winner!
-                    print(f'Winner is agent {winner}: {agent_names[players[winner-1]]}')
-                else:
-                    # this game is a draw
-                    print(f'This game is a DRAW!')
-                # Grab game time
-                elapsed_time = time.time() - start_time
-                elapsed_time_str = "{:.4f}".format(elapsed_time)
-                #Record the winner into excel sheet
-                helper.record_to_excel(agent_names[players[0]], agent_names[players[1]], winner, elapsed_time_str, heuristics_names[their_heuristics[0]], heuristics_names[their_heuristics[1]], board, max_depth) 
-            
+            # initiate a new game using the same agents when one ends
             if not forever:
                 break
-            else:
-                if (winner != 3):
-                    wins[winner-1] = wins[winner-1] + 1
-
-                if not tournament:
-                    print(f'Current wins: {wins[0]} to {wins[1]}')
-                else:
-                    current_pair_game_count = current_pair_game_count + 1
-                    if (current_pair_game_count % int(games_per_pair/10) == 0):
-                        print(f'{(100*current_pair_game_count) / games_per_pair}% ', end='')
-                    # If this pair is done -> next pair:
-                    if current_pair_game_count == games_per_pair:
-                        # Grab game time
-                        elapsed_time = (time.time() - start_time) / float(games_per_pair)
-                        elapsed_time_str = "{:.4f}".format(elapsed_time)
-                        # Record to excel
-                        if wins[0]+wins[1] <= 1e-6:
-                            winrate = 0.0
-                        else:
-                            winrate = 100.0*float(wins[0])/float(wins[0]+wins[1])
-                        print(f'Average time: {elapsed_time_str}; {agent_names[players[0]]}|{heuristics_names[their_heuristics[0]]} vs {agent_names[players[1]]}|{heuristics_names[their_heuristics[1]]}: {winrate}%')
-                        helper.record_to_excel(agent_names[players[0]], agent_names[players[1]], winrate, elapsed_time_str, heuristics_names[their_heuristics[0]], heuristics_names[their_heuristics[1]], None, max_depth, tournament=True)
-                        # Reset statistics
-                        wins = [0, 0]
-                        start_time = time.time()
-                        current_pair_game_count = 0
-                        # next pair
-                        tournament_index[3] = tournament_index[3]+1
-                        if tournament_index[3] == len(heuristics_names):
-                            tournament_index[3] = 0
-                            tournament_index[2] = tournament_index[2]+1
-                            if tournament_index[2] == len(agent_names):
-                                tournament_index[2] = 0
-                                tournament_index[1] = tournament_index[1]+1
-                                if tournament_index[1] == len(heuristics_names):
-                                    tournament_index[1] = 0
-                                    tournament_index[0] = tournament_index[0]+1
-                                    if tournament_index[0] == len(agent_names):
-                                        break
-                        players = [tournament_index[0], tournament_index[2]]
-                        their_heuristics = [tournament_index[1], tournament_index[3]]
-    
-                # Initiate a new game when one ends. 
-                board = np.zeros([c, r], dtype=int)
-                if not tournament:
-                    helper.print_board(board)
-                next = 1
-                continue
-        # Flip between agent 1 and 2
-        next = int(next == 1) + 1
+            if (winner != 3):
+                wins[winner-1] = wins[winner-1] + 1
+            print(f'Current wins: {wins[0]} to {wins[1]}')
+    finally:
+        # Write the excel sheet once, even if the games were interrupted
+        if sink.export_xlsx("game_data.xlsx"):
+            print(f"Data appended to game_data.xlsx")
+        for name, (hits, misses) in evalcache.stats().items():
+            print(f'Evaluation cache {name}: {hits} hits, {misses} misses')
     return
 
-main()
\ No newline at end of file
+# Guarded so that importing this file (e.g. from tournament workers) has no side effects
+if __name__ == '__main__':
+    main()
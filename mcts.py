@@ -0,0 +1,236 @@
+# Monte Carlo tree search (UCT) behind agent_mcts
+# Nodes live in parallel lists indexed by node id instead of one object or dict
+# per node; the children of a node are stored next to each other.
+
+import math
+import random
+import time
+
+import numpy as np
+
+import playout
+
+# Exploration constant of UCB1
+C = math.sqrt(2)
+# Playouts run together from each new leaf by agent_mcts, see MCTS.iterate
+BATCH = 64
+
+
+# Play random moves until the game ends.
+# Input: Bitboard pos = position to play out, modified in place
+# Return: int winner = 1/2, or 3 for a draw
+def random_playout(pos):
+    while pos.winner == 0:
+        pos.play(random.choice(pos.legal_moves()))
+    return pos.winner
+
+
+class MCTS:
+    # Input: Bitboard pos = the root position; copied
+    def __init__(self, pos):
+        self.root_pos = pos.copy()
+        self.move = [-1]
+        # Player whose piece was dropped to reach the node; wins are counted for them
+        self.mover = [3 - pos.turn]
+        self.visits = [0]
+        self.wins = [0.0]
+        # -1 until the node is expanded
+        self.first_child = [-1]
+        self.n_children = [0]
+        # Statistics of the last search; playouts leave out the simulations
+        # that ended on a finished game without playing
+        self.simulations = 0
+        self.playouts = 0
+        self.elapsed = 0.0
+
+    def __len__(self):
+        return len(self.visits)
+
+    # Append the children of node i, one per legal move, in random order.
+    def expand(self, i, pos):
+        moves = pos.legal_moves()
+        random.shuffle(moves)
+        self.first_child[i] = len(self.visits)
+        self.n_children[i] = len(moves)
+        for col in moves:
+            self.move.append(col)
+            self.mover.append(pos.turn)
+            self.visits.append(0)
+            self.wins.append(0.0)
+            self.first_child.append(-1)
+            self.n_children.append(0)
+
+    # UCB1 over the children of node i; unvisited children come first.
+    def select_child(self, i):
+        first = self.first_child[i]
+        log_n = math.log(self.visits[i])
+        best = first
+        best_score = -1.0
+        for j in range(first, first + self.n_children[i]):
+            v = self.visits[j]
+            if v == 0:
+                return j
+            score = self.wins[j] / v + C * math.sqrt(log_n / v)
+            if score > best_score:
+                best_score = score
+                best = j
+        return best
+
+    # Selection and expansion: walk down by UCB1 and expand the leaf reached
+    # if it was visited before.
+    # Return: (Bitboard pos, int[] path) pos = the new leaf's position,
+    #         path = node ids from the root to it
+    def select(self):
+        pos = self.root_pos.copy()
+        path = [0]
+        i = 0
+        while self.first_child[i] >= 0 and self.n_children[i] > 0:
+            i = self.select_child(i)
+            pos.play(self.move[i])
+            path.append(i)
+        if pos.winner == 0 and self.visits[i] > 0:
+            self.expand(i, pos)
+            i = self.first_child[i]
+            pos.play(self.move[i])
+            path.append(i)
+        return pos, path
+
+    # Input: int[] path = as returned by select
+    #        int[] counts = counts[k] = playouts won by k (3 = draws)
+    #        int batch = playouts in counts
+    def backpropagate(self, path, counts, batch):
+        draws = 0.5 * counts[3]
+        for j in path:
+            self.visits[j] += batch
+            self.wins[j] += counts[self.mover[j]] + draws
+
+    # One selection-expansion-playout-backpropagation pass.
+    # Input: int batch = playouts run from the new leaf; more than 1 plays
+    #                    them together through playout.batch_playout
+    def iterate(self, batch=1):
+        pos, path = self.select()
+        # Simulation; counts[k] = playouts won by k (3 = draws)
+        counts = [0, 0, 0, 0]
+        if pos.winner != 0:
+            counts[pos.winner] = batch
+        elif batch == 1:
+            counts[random_playout(pos)] = 1
+            self.playouts += 1
+        else:
+            counts = np.bincount(playout.batch_playout([pos], batch), minlength=4).tolist()
+            self.playouts += batch
+        self.backpropagate(path, counts, batch)
+
+    # Return: {int column: (int visits, float wins)} of the root's children
+    def root_stats(self):
+        first = self.first_child[0]
+        return {self.move[j]: (self.visits[j], self.wins[j]) for j in range(first, first + self.n_children[0])}
+
+    # Run iterations until the time budget is used up.
+    # Input: float seconds = time budget
+    #        int batch = playouts per iteration, see iterate
+    # Return: int column = the most visited root move
+    def search(self, seconds, batch=1):
+        start_time = time.time()
+        deadline = start_time + seconds
+        self.simulations = 0
+        self.playouts = 0
+        # Always leave the root expanded so there is a move to return
+        if self.first_child[0] < 0:
+            self.visits[0] += 1
+            self.expand(0, self.root_pos)
+        while time.time() < deadline:
+            self.iterate(batch)
+            self.simulations += batch
+        self.elapsed = time.time() - start_time
+        return self.best_move()
+
+    # Return: int column = the root move with the most visits
+    def best_move(self):
+        first = self.first_child[0]
+        children = range(first, first + self.n_children[0])
+        return self.move[max(children, key=lambda j: self.visits[j])]
+
+    # Return: float = playouts per second of the last search
+    def sims_per_second(self):
+        if self.elapsed <= 0:
+            return 0.0
+        return self.simulations / self.elapsed
+
+    # Find the node reached from the root by the given moves.
+    # Return: int node id, or None if that part of the tree was never expanded
+    def find(self, moves):
+        i = 0
+        for col in moves:
+            if self.first_child[i] < 0:
+                return None
+            first = self.first_child[i]
+            for j in range(first, first + self.n_children[i]):
+                if self.move[j] == col:
+                    i = j
+                    break
+            else:
+                return None
+        return i
+
+    # Make the subtree under node i the new tree, dropping everything else.
+    # Input: int i = node id
+    #        Bitboard pos = the position at node i
+    # Return: MCTS
+    def subtree(self, i, pos):
+        tree = MCTS(pos)
+        tree.visits[0] = self.visits[i]
+        tree.wins[0] = self.wins[i]
+        # The children of a node are copied together so they stay next to each other
+        queue = [(i, 0)]
+        while queue:
+            old, new = queue.pop()
+            if self.first_child[old] < 0:
+                continue
+            first = self.first_child[old]
+            tree.first_child[new] = len(tree.visits)
+            tree.n_children[new] = self.n_children[old]
+            for j in range(first, first + self.n_children[old]):
+                queue.append((j, len(tree.visits)))
+                tree.move.append(self.move[j])
+                tree.mover.append(self.mover[j])
+                tree.visits.append(self.visits[j])
+                tree.wins.append(self.wins[j])
+                tree.first_child.append(-1)
+                tree.n_children.append(0)
+        return tree
+
+
+# The tree of each player, kept between moves: (agent ID, c, r, w) -> MCTS
+trees = {}
+
+
+# Get a tree rooted at pos, reusing the subtree of the last search of this
+# player if pos is two plies (our move, their reply) below its root.
+# Input: Bitboard pos = current position
+#        int n = agent ID
+# Return: MCTS
+def get_tree(pos, n):
+    key = (n, pos.c, pos.r, pos.w)
+    tree = trees.get(key)
+    if tree is not None:
+        old = tree.root_pos
+        i = None
+        # Try every (our move, their reply) pair that leads to pos
+        for col in old.legal_moves():
+            old.play(col)
+            for reply in old.legal_moves():
+                old.play(reply)
+                if old.hash == pos.hash and old.key() == pos.key():
+                    i = tree.find([col, reply])
+                old.undo()
+                if i is not None:
+                    break
+            old.undo()
+            if i is not None:
+                break
+        tree = tree.subtree(i, pos) if i is not None else None
+    if tree is None:
+        tree = MCTS(pos)
+    trees[key] = tree
+    return tree
@@ -0,0 +1,281 @@
+# Parallel searches of the Connect-4 project
+#
+# Minimax: the root moves are split across a pool of worker processes, each searching
+# one move's subtree with the serial search.minimax. The first move in the
+# root ordering is searched alone first ("young brothers wait"), so the others
+# start with its score as a bound; after that the best score found so far is
+# kept in shared memory and every root move searched later starts from it.
+#
+# The move returned is the one the serial search returns at the same depth:
+# the first move in the same root order with the best score. A move is only
+# cut off by the shared bound if it is strictly worse, which needs integer
+# scores, as every heuristic in heuristics.py returns.
+#
+# MCTS, two ways:
+#   root = every worker grows its own tree from the position until the
+#          deadline; the visit counts of the root moves are added up and the
+#          most visited move is played
+#   leaf = one tree in this process; the playouts of every new leaf are split
+#          across the workers and run at the same time
+#
+# A process that is itself a pool worker (e.g. a tournament worker) searches
+# serially instead of starting a pool of its own, see in_worker.
+
+import atexit
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+import evalcache
+import mcts
+import playout
+import search
+from bitboard import Bitboard
+from search import SearchContext, WIN_SCORE
+
+# Worker processes used when none are given
+WORKERS = os.cpu_count() or 1
+# Parallel MCTS used when none is given: 'root' or 'leaf'
+MCTS_MODE = 'root'
+# Playouts per worker for every leaf of a leaf-parallel search
+LEAF_BATCH = 256
+# Seconds kept back from the time budget for collecting the workers' results
+MARGIN = 0.01
+
+# In a worker: the best root score so far, shared with the parent
+shared = None
+
+
+def init_worker(bound):
+    global shared
+    shared = bound
+
+
+# Search one root move in a worker.
+# Input: (int[][] b, int turn, int w, int n, func h, bool cached, int d, int col, bool bounded) job
+#        b, turn = the root position and who moves there
+#        cached = memoize h in this worker's own evalcache, kept across jobs
+#        bounded = start from the shared best score
+# Return: (int col, int value, bool exact, int nodes, int hits, int misses)
+#         exact = False if the move was cut off and value is only a bound
+#         (never better than the best)
+#         hits, misses = of the worker's cache during this job
+def search_move(job):
+    b, turn, w, n, h, cached, d, col, bounded = job
+    if cached:
+        h = evalcache.get_cache(h)
+        hits = h.hits
+        misses = h.misses
+    pos = Bitboard.from_array(b, w, turn=turn)
+    maximizing = pos.turn == n
+    alpha = -WIN_SCORE
+    beta = WIN_SCORE
+    if bounded:
+        # One below (above) the best, so a move scoring the same is still exact
+        if maximizing:
+            alpha = int(shared.value) - 1
+        else:
+            beta = int(shared.value) + 1
+    pos.play(col)
+    if pos.winner != 0 or d <= 1:
+        ctx = SearchContext()
+    else:
+        tt = search.get_table(n, h, w)
+        tt.new_search()
+        ctx = SearchContext(tt)
+    _, value = search.minimax(pos, n, h, d - 1, alpha, beta, ctx)
+    exact = alpha < value < beta or value in (WIN_SCORE, -WIN_SCORE)
+    if cached:
+        return col, value, exact, ctx.nodes, h.hits - hits, h.misses - misses
+    return col, value, exact, ctx.nodes, 0, 0
+
+
+# One pool and shared bound per worker count, started on first use and kept
+# so that later moves do not pay for starting processes again
+pools = {}
+
+
+def get_pool(workers):
+    if workers not in pools:
+        bound = multiprocessing.Value('d', 0.0, lock=False)
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(bound,))
+        pools[workers] = (pool, bound)
+    return pools[workers]
+
+
+def shutdown():
+    for pool, _ in pools.values():
+        pool.shutdown()
+    pools.clear()
+
+
+atexit.register(shutdown)
+
+
+# Return: bool = this process was started by multiprocessing, as the workers of
+#         a pool are; its searches then run serially, as a pool of its own would
+#         not be shut down before its parent waits for it, and would put
+#         workers x workers processes on the machine
+def in_worker():
+    return multiprocessing.parent_process() is not None
+
+
+# Minimax with the root moves split across worker processes.
+# Same quirk as search.minimax: the root is searched for whoever pos.turn is,
+# maximizing if that is n and minimizing otherwise.
+# Input: Bitboard pos = position to search, left untouched
+#        int n = agent ID (as shown on board) playing FOR
+#        func h = the heuristic function; must be picklable (a module-level
+#                 function), or an evalcache.EvalCache of one
+#        int d = depth limit
+#        int workers = processes to use; WORKERS if None
+#        stats.SearchStats stats = nodes are added to it, or None
+# Return: (int column, int value)
+def parallel_minimax(pos, n, h, d, workers=None, stats=None):
+    if in_worker():
+        tt = search.get_table(n, h, pos.w)
+        tt.new_search()
+        return search.minimax(pos, n, h, d, ctx=SearchContext(tt, stats=stats))
+    if workers is None:
+        workers = WORKERS
+    # The same root order as the serial search, which leaves the table move out
+    tt = search.get_table(n, h, pos.w)
+    key, flip = search.table_key(pos, search.is_symmetric(h))
+    ctx = SearchContext()
+    ctx.root_ply = len(pos.moves)
+    play = ctx.order(pos, None, None)
+    maximizing = pos.turn == n
+
+    b = pos.to_array()
+    pool, bound = get_pool(workers)
+    results = {}
+    nodes = 1
+    # An EvalCache is sent as the heuristic it wraps: pickled, it would arrive
+    # as a new cache (and so get a new table, see search.get_table) every job
+    cache = h if isinstance(h, evalcache.EvalCache) else None
+    base = h if cache is None else cache.h
+
+    def collect(result):
+        col, value, exact, count, hits, misses = result
+        results[col] = (value, exact)
+        if cache is not None:
+            cache.hits += hits
+            cache.misses += misses
+        if exact and (value > bound.value if maximizing else value < bound.value):
+            bound.value = value
+        return count
+
+    bound.value = -WIN_SCORE if maximizing else WIN_SCORE
+    # Eldest brother first, with a full window
+    nodes += collect(pool.submit(search_move, (b, pos.turn, pos.w, n, base, cache is not None, d, play[0], False)).result())
+    pending = set()
+    for col in play[1:]:
+        pending.add(pool.submit(search_move, (b, pos.turn, pos.w, n, base, cache is not None, d, col, True)))
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            nodes += collect(future.result())
+    if stats is not None:
+        stats.nodes += nodes
+
+    # First move in root order with the best score, as the serial search picks
+    column = None
+    value = None
+    for col in play:
+        v, exact = results[col]
+        if not exact:
+            continue
+        if column is None or (v > value if maximizing else v < value):
+            column = col
+            value = v
+    tt.store(key, d, search.EXACT, value, pos.canonical_move(column) if flip else column)
+    return column, value
+
+
+# Grow a tree in a worker until the deadline (root parallelization).
+# Input: (Bitboard pos, int n, float deadline, int seed) job
+#        deadline = time.time() at which the search must stop
+# Return: ({int column: (int visits, float wins)} root, int simulations, int playouts)
+def mcts_root_job(job):
+    pos, n, deadline, seed = job
+    np.random.seed(seed)
+    random.seed(seed)
+    # Reuses this worker's tree of the last move when it can, see mcts.get_tree
+    tree = mcts.get_tree(pos, n)
+    tree.search(max(0.0, deadline - time.time()), mcts.BATCH)
+    return tree.root_stats(), tree.simulations, tree.playouts
+
+
+# Run playouts from one leaf in a worker (leaf parallelization).
+# Input: (Bitboard pos, int games, int seed) job
+# Return: int[] counts = counts[k] = playouts won by k (3 = draws)
+def mcts_leaf_job(job):
+    pos, games, seed = job
+    rng = np.random.RandomState(seed)
+    return np.bincount(playout.batch_playout([pos], games, rng), minlength=4).tolist()
+
+
+# Parallel MCTS, see the top of this file.
+# Input: Bitboard pos = position to search, with the side to move set
+#        int n = agent ID
+#        float seconds = time budget, collecting the results included
+#        int workers = processes to use; WORKERS if None
+#        str mode = 'root' or 'leaf'; MCTS_MODE if None
+#        stats.SearchStats stats = simulations and playouts are added to it, or None
+# Return: int column = the most visited root move
+def parallel_mcts(pos, n, seconds, workers=None, mode=None, stats=None):
+    if in_worker():
+        tree = mcts.get_tree(pos, n)
+        column = tree.search(seconds, mcts.BATCH)
+        if stats is not None:
+            stats.simulations += tree.simulations
+            stats.playouts += tree.playouts
+        return int(column)
+    deadline = time.time() + seconds - MARGIN
+    if workers is None:
+        workers = WORKERS
+    if mode is None:
+        mode = MCTS_MODE
+    pool, _ = get_pool(workers)
+    simulations = 0
+    playouts = 0
+    if mode == 'root':
+        seeds = np.random.randint(0, 2**31 - 1, size=workers).tolist()
+        futures = [pool.submit(mcts_root_job, (pos, n, deadline, seed)) for seed in seeds]
+        visits = {}
+        for future in futures:
+            root, sims, games = future.result()
+            for col, (v, _) in root.items():
+                visits[col] = visits.get(col, 0) + v
+            simulations += sims
+            playouts += games
+        column = max(pos.legal_moves(), key=lambda col: visits.get(col, 0))
+    elif mode == 'leaf':
+        tree = mcts.get_tree(pos, n)
+        if tree.first_child[0] < 0:
+            tree.visits[0] += 1
+            tree.expand(0, tree.root_pos)
+        batch = LEAF_BATCH * workers
+        while time.time() < deadline:
+            leaf, path = tree.select()
+            counts = [0, 0, 0, 0]
+            if leaf.winner != 0:
+                counts[leaf.winner] = batch
+            else:
+                seeds = np.random.randint(0, 2**31 - 1, size=workers).tolist()
+                for future in [pool.submit(mcts_leaf_job, (leaf, LEAF_BATCH, seed)) for seed in seeds]:
+                    counts = [a + b for a, b in zip(counts, future.result())]
+                playouts += batch
+            tree.backpropagate(path, counts, batch)
+            simulations += batch
+        column = tree.best_move()
+    else:
+        raise ValueError(f'Unknown parallel MCTS mode {mode}.')
+    if stats is not None:
+        stats.simulations += simulations
+        stats.playouts += playouts
+    return int(column)
@@ -0,0 +1,126 @@
+# Batched random playouts for Monte Carlo search
+# Thousands of games are advanced together as NumPy arrays of uint64
+# bitboards (same bit layout as bitboard.py); every step drops one random legal
+# piece in each unfinished game and checks those games for a win.
+# Boards of more than 64 bits (e.g. 9x7 or 12x10) are played on arrays of
+# cells instead, checking only the cells around each new piece, see
+# cell_playout.
+
+import numpy as np
+
+import lines
+
+
+# Play out many games at once.
+# Input: Bitboard[] positions = starting positions; not modified
+#        int games = playouts per starting position
+#        rng = NumPy random generator (or the np.random module)
+# Return: int[] winners, of length len(positions)*games, game k starting from
+#         positions[k // games]: 1/2 for a win, 3 for a draw
+def batch_playout(positions, games, rng=np.random):
+    pos = positions[0]
+    c, r, w, h = pos.c, pos.r, pos.w, pos.h
+    total = len(positions) * games
+    winners = np.array([p.winner for p in positions], dtype=np.int8).repeat(games)
+    if c * h > 64:
+        # Does not fit in a uint64
+        return cell_playout(positions, games, rng, winners)
+
+    pieces = np.array([p.pieces for p in positions], dtype=np.uint64).repeat(games, axis=0)
+    heights = np.array([p.heights for p in positions], dtype=np.int64).repeat(games, axis=0)
+    turn = np.array([p.turn for p in positions], dtype=np.int64).repeat(games)
+    free = np.array([p.free for p in positions], dtype=np.int64).repeat(games)
+    shifts = [np.uint64(s) for s in pos.shifts]
+    # Games still running, as indexes into the arrays above
+    live = np.flatnonzero(winners == 0)
+    while len(live):
+        hl = heights[live]
+        legal = hl < r
+        # A random legal column per game: the largest random key among legal columns
+        col = np.argmax(rng.random(legal.shape) * legal, axis=1)
+        row = hl[np.arange(len(live)), col]
+        mover = turn[live] - 1
+        p = pieces[live, mover] | (np.uint64(1) << (col * h + row).astype(np.uint64))
+        pieces[live, mover] = p
+        heights[live, col] += 1
+        turn[live] = 2 - mover
+        free[live] -= 1
+        # Only the mover can have won
+        won = np.zeros(len(live), dtype=bool)
+        for s in shifts:
+            m = p
+            run = 1
+            while run < w:
+                step = min(run, w - run)
+                m = m & (m >> (s * np.uint64(step)))
+                run += step
+            won |= m != 0
+        winners[live[won]] = mover[won] + 1
+        winners[live[~won & (free[live] == 0)]] = 3
+        live = live[winners[live] == 0]
+    return winners
+
+
+# batch_playout on boards of any size: every game is a row of c*r cells
+# (b.reshape(c*r) of the array board), plus one cell that stays empty.
+# A move only looks at the w-1 cells on either side of it in each direction,
+# gathered for every game at once, and wins if it extends a run to w.
+# Input: Bitboard[] positions, int games, rng = as for batch_playout
+#        int[] winners = status of every game at the start, repeated per game
+# Return: int[] winners, as for batch_playout
+def cell_playout(positions, games, rng, winners):
+    pos = positions[0]
+    c, r, w = pos.c, pos.r, pos.w
+    # around[k, d, side, i] = the cell i+1 steps from cell k along direction
+    # d, forwards (side 0) or backwards (side 1); the empty cell if off the board
+    around = np.full((c * r, len(lines.DIRECTIONS), 2, max(1, w - 1)), c * r, dtype=np.intp)
+    for col in range(c):
+        for row in range(r):
+            for d, (dc, dr) in enumerate(lines.DIRECTIONS):
+                for side, sign in enumerate((1, -1)):
+                    for i in range(w - 1):
+                        cc = col + sign * dc * (i + 1)
+                        rr = row + sign * dr * (i + 1)
+                        if 0 <= cc < c and 0 <= rr < r:
+                            around[col * r + row, d, side, i] = cc * r + rr
+
+    cell = np.zeros((len(positions), c * r + 1), dtype=np.int8)
+    for k, p in enumerate(positions):
+        cell[k, :c * r] = p.to_array().reshape(c * r)
+    cell = cell.repeat(games, axis=0)
+    heights = np.array([p.heights for p in positions], dtype=np.int64).repeat(games, axis=0)
+    turn = np.array([p.turn for p in positions], dtype=np.int8).repeat(games)
+    free = np.array([p.free for p in positions], dtype=np.int64).repeat(games)
+    live = np.flatnonzero(winners == 0)
+    while len(live):
+        hl = heights[live]
+        legal = hl < r
+        col = np.argmax(rng.random(legal.shape) * legal, axis=1)
+        k = col * r + hl[np.arange(len(live)), col]
+        mover = turn[live]
+        cell[live, k] = mover
+        heights[live, col] += 1
+        turn[live] = 3 - mover
+        free[live] -= 1
+        # Length of the mover's run through k in every direction
+        same = cell[live[:, None, None, None], around[k]] == mover[:, None, None, None]
+        run = 1 + np.cumprod(same, axis=3).sum(axis=(2, 3))
+        won = np.any(run >= w, axis=1)
+        winners[live[won]] = mover[won]
+        winners[live[~won & (free[live] == 0)]] = 3
+        live = live[winners[live] == 0]
+    return winners
+
+
+# Win/draw/loss counts of random playouts, from the view of the player to
+# move at each starting position.
+# Input: Bitboard[] positions = starting positions; not modified
+#        int games = playouts per starting position
+#        rng = NumPy random generator (or the np.random module)
+# Return: int[][] = one row [wins, draws, losses] per starting position
+def playout_histogram(positions, games, rng=np.random):
+    winners = batch_playout(positions, games, rng).reshape(len(positions), games)
+    turn = np.array([p.turn for p in positions])[:, None]
+    wins = np.count_nonzero(winners == turn, axis=1)
+    draws = np.count_nonzero(winners == 3, axis=1)
+    return np.stack([wins, draws, games - wins - draws], axis=1)
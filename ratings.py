@@ -0,0 +1,157 @@
+# Ratings of the Connect-4 project
+# Players (an agent with a heuristic, named "agent|heuristic") are rated from
+# game results fed in one at a time: Elo ratings are updated after every game,
+# and a Bradley-Terry fit over all games seen so far can be asked for at any
+# point. Instead of a full round robin, the tournament asks for the most
+# informative pair to play next, see Ratings.pick and tournament.run_rated.
+#
+# Games recorded as rows of helper.GAME_HEADERS (game_data.jsonl, or the
+# game_data_rated.jsonl stream of tournament.run_rated) can be rated from the
+# file, also while the run writing it is still going:
+#
+#   python ratings.py game_data_rated.jsonl
+
+import json
+import math
+import sys
+
+# Rating of a player who has not played yet
+START = 1500.0
+# Elo update step
+K = 24.0
+# Rating difference at which the stronger player is expected to score 10:1
+SCALE = 400.0
+
+
+# Input: float a, b = ratings
+# Return: float = expected score of a against b, a draw counting 0.5
+def expected(a, b):
+    return 1.0 / (1.0 + 10.0 ** ((b - a) / SCALE))
+
+
+# Input: str p1, p2 = players
+# Return: (str, str) = the two in sorted order, the key of their games
+def pair_key(p1, p2):
+    return (p1, p2) if p1 <= p2 else (p2, p1)
+
+
+class Ratings:
+    # Input: float k = Elo update step
+    def __init__(self, k=K):
+        self.k = k
+        # {str player: float Elo rating}
+        self.elo = {}
+        # {(str, str) pair_key: [float points of the first, int games]}
+        self.pairs = {}
+
+    def add_player(self, p):
+        if p not in self.elo:
+            self.elo[p] = START
+
+    # Take in one game.
+    # Input: str p1, p2 = players, p1 moving first
+    #        int winner = 1/2, or 3 for a draw
+    def add(self, p1, p2, winner):
+        self.add_player(p1)
+        self.add_player(p2)
+        score = {1: 1.0, 2: 0.0, 3: 0.5}[winner]
+        change = self.k * (score - expected(self.elo[p1], self.elo[p2]))
+        self.elo[p1] += change
+        self.elo[p2] -= change
+        key = pair_key(p1, p2)
+        if key not in self.pairs:
+            self.pairs[key] = [0.0, 0]
+        self.pairs[key][0] += score if key[0] == p1 else 1.0 - score
+        self.pairs[key][1] += 1
+
+    # Return: int = games played between p1 and p2
+    def played(self, p1, p2):
+        return self.pairs.get(pair_key(p1, p2), (0.0, 0))[1]
+
+    # Return: int = games played by p
+    def games(self, p):
+        return sum(n for key, (_, n) in self.pairs.items() if p in key)
+
+    # Bradley-Terry strengths of every player, fit to all games so far by
+    # minorization-maximization. A draw counts as half a win for each side.
+    # Every player also gets one virtual draw against a player of strength 1,
+    # so a player who never lost (or never won) still gets a finite rating.
+    # Input: int iterations = MM steps
+    # Return: {str player: float rating} on the Elo scale, averaging START
+    def bradley_terry(self, iterations=200):
+        players = list(self.elo)
+        if not players:
+            return {}
+        points = {p: 0.5 for p in players}
+        for (p, q), (s, n) in self.pairs.items():
+            points[p] += s
+            points[q] += n - s
+        gamma = {p: 1.0 for p in players}
+        for _ in range(iterations):
+            denominator = {p: 1.0 / (gamma[p] + 1.0) for p in players}
+            for (p, q), (_, n) in self.pairs.items():
+                share = n / (gamma[p] + gamma[q])
+                denominator[p] += share
+                denominator[q] += share
+            gamma = {p: points[p] / denominator[p] for p in players}
+            # Keep the geometric mean at 1
+            mean = sum(math.log(g) for g in gamma.values()) / len(players)
+            gamma = {p: g / math.exp(mean) for p, g in gamma.items()}
+        return {p: START + SCALE * math.log10(g) for p, g in gamma.items()}
+
+    # The pair whose next game tells the most: the one whose result is least
+    # predictable (expected score nearest 0.5), discounted by the games the two
+    # have already played. Ties go to the first pair in players order.
+    # Input: str[] players = who may be picked
+    #        {(str, str) pair_key: int} pending = games started but not added yet
+    # Return: (str p1, str p2) = the pair, p1 to move first; the two take turns
+    #         moving first over their games
+    def pick(self, players, pending=None):
+        if pending is None:
+            pending = {}
+        best = None
+        for a in range(len(players)):
+            for b in range(a + 1, len(players)):
+                key = pair_key(players[a], players[b])
+                n = self.played(*key) + pending.get(key, 0)
+                e = expected(self.elo.get(key[0], START), self.elo.get(key[1], START))
+                value = e * (1.0 - e) / (1.0 + n)
+                if best is None or value > best[0]:
+                    best = (value, key, n)
+        _, (p, q), n = best
+        return (p, q) if n % 2 == 0 else (q, p)
+
+    # Return: [(str player, float elo, float bradley_terry, int games)], best Elo first
+    def standings(self):
+        bt = self.bradley_terry()
+        rows = [(p, self.elo[p], bt[p], self.games(p)) for p in self.elo]
+        return sorted(rows, key=lambda row: -row[1])
+
+    # Return: str = the standings, one player per line
+    def summary(self):
+        lines = [f'{"player":<40} {"elo":>8} {"bt":>8} {"games":>6}']
+        for p, elo, bt, games in self.standings():
+            lines.append(f'{p:<40} {elo:>8.1f} {bt:>8.1f} {games:>6}')
+        return '\n'.join(lines)
+
+
+# Rate the games of a JSON-lines file of helper.GAME_HEADERS rows.
+# A half-written last line (of a run still going) is skipped.
+# Input: str path
+#        Ratings rating = to add the games to; a new one if None
+# Return: Ratings
+def load(path, rating=None):
+    if rating is None:
+        rating = Ratings()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            rating.add(f"{row['Agent 1']}|{row['Heuristic 1']}", f"{row['Agent 2']}|{row['Heuristic 2']}", int(row['Winner']))
+    return rating
+
+
+if __name__ == '__main__':
+    print(load(sys.argv[1] if len(sys.argv) > 1 else 'game_data_rated.jsonl').summary())
@@ -0,0 +1,94 @@
+# Buffered recording of game and tournament results
+# Rows are kept in memory and appended to a JSON-lines file every few rows or
+# seconds; the Excel workbook is written once, from that file, at the end of
+# a run. An interrupted run loses at most the rows not flushed yet, and a
+# half-written last line is skipped when the file is read back.
+
+import json
+import os
+import time
+
+import helper
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; appends are then not locked
+    fcntl = None
+
+
+class ResultsSink:
+    # Input: str path = JSON-lines file to append to
+    #        str[] headers = column names, in workbook order
+    #        int flush_every = write out after this many buffered rows
+    #        float flush_seconds = or after this many seconds since the last write
+    def __init__(self, path, headers, flush_every=100, flush_seconds=30.0):
+        self.path = path
+        self.headers = list(headers)
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.buffer = []
+        self.last_flush = time.time()
+        # Rows of earlier runs in the same file are not exported again
+        self.offset = 0
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb+') as f:
+                f.seek(-1, os.SEEK_END)
+                # Start on a fresh line if an earlier run was cut off mid-line
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+            self.offset = os.path.getsize(path)
+
+    # Input: list row = one value per header
+    def add(self, row):
+        self.buffer.append(dict(zip(self.headers, row)))
+        if len(self.buffer) >= self.flush_every or time.time() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    # Append the buffered rows to the file with a single locked write, so
+    # several processes can share one file.
+    def flush(self):
+        self.last_flush = time.time()
+        if not self.buffer:
+            return
+        data = ''.join(json.dumps(row, default=str) + '\n' for row in self.buffer)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        self.buffer = []
+
+    # Return: list[] = every row added through this sink (flushed or not), as
+    #         lists in header order; rows of other processes sharing the file
+    #         since this sink was opened are included
+    def rows(self):
+        rows = []
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                f.seek(self.offset)
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Cut short by an interrupted write
+                        continue
+                    rows.append([record.get(h) for h in self.headers])
+        rows.extend([record.get(h) for h in self.headers] for record in self.buffer)
+        return rows
+
+    # Write all rows into an Excel workbook in one go.
+    # Input: str file_name = workbook to append to (created if missing)
+    # Return: int = number of rows exported
+    def export_xlsx(self, file_name):
+        self.flush()
+        rows = self.rows()
+        if rows:
+            helper.append_rows_to_excel(file_name, self.headers, rows)
+        return len(rows)
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,78 @@
+# Adaptive game scheduling for the tournament runner
+# Instead of a fixed number of games per pair, games are played in batches and
+# a pair is stopped as soon as its result is settled: the confidence interval
+# of its winrate no longer contains 50% (one side is clearly better), or it is
+# narrower than the precision asked for (the pair is close, and known to be).
+# Among the pairs still running, the next games go to the least settled one,
+# so the compute freed by lopsided pairs goes to the close matchups.
+#
+# A pair's next batch is only decided once its last batch is all in, so which
+# games (and seeds) a pair plays depends on its own results alone, not on the
+# order games finish in.
+
+import math
+
+# z of the two-sided normal interval, per confidence
+Z = {0.9: 1.6449, 0.95: 1.9600, 0.99: 2.5758}
+
+
+# Wilson score interval of a winrate.
+# Input: int wins = games won
+#        int games = games decided
+#        float z = see Z
+# Return: (float low, float high) in [0, 1]; (0, 1) if no game was decided
+def wilson_interval(wins, games, z):
+    if games == 0:
+        return 0.0, 1.0
+    p = wins / games
+    denominator = 1 + z*z/games
+    center = (p + z*z/(2*games)) / denominator
+    spread = z * math.sqrt(p*(1-p)/games + z*z/(4*games*games)) / denominator
+    return max(0.0, center - spread), min(1.0, center + spread)
+
+
+class AdaptiveSchedule:
+    # Input: int max_games = most games played by one pair
+    #        int batch = games scheduled at a time for one pair
+    #        int min_games = games played by every pair before it can stop
+    #        float confidence = of the interval; one of the keys of Z
+    #        float precision = a pair also stops once its interval is at most
+    #                          this wide, in percent
+    def __init__(self, max_games, batch=10, min_games=20, confidence=0.95, precision=20.0):
+        self.max_games = max_games
+        self.batch = batch
+        self.min_games = min(min_games, max_games)
+        self.z = Z[confidence]
+        self.precision = precision / 100.0
+
+    # Input: int[] wins = [wins of agent 1, wins of agent 2]
+    # Return: (float low, float high) = interval of agent 1's winrate over decided games
+    def interval(self, wins):
+        return wilson_interval(wins[0], wins[0] + wins[1], self.z)
+
+    # Input: int[] wins = as for interval
+    #        int games = games played, draws included
+    # Return: bool = the pair needs no more games
+    def settled(self, wins, games):
+        if games >= self.max_games:
+            return True
+        if games < self.min_games:
+            return False
+        if wins[0] + wins[1] == 0:
+            # Every game so far was a draw
+            return True
+        low, high = self.interval(wins)
+        return low > 0.5 or high < 0.5 or high - low <= self.precision
+
+    # Input: int[] wins, int games = as for settled
+    # Return: int = games to schedule next for the pair; 0 if it is settled
+    def next_batch(self, wins, games):
+        if self.settled(wins, games):
+            return 0
+        return min(self.batch, self.max_games - games)
+
+    # Input: int[] wins = as for interval
+    # Return: float = how unsettled the pair is; the highest is played first
+    def priority(self, wins):
+        low, high = self.interval(wins)
+        return high - low
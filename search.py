@@ -0,0 +1,387 @@
+# Search routines behind the agents of the Connect-4 project
+
+import inspect
+import time
+
+import numpy as np
+
+import lines
+
+WIN_SCORE = 9999999
+
+# Bound types of a transposition table entry
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Default number of slots per transposition table; must be a power of 2
+TT_SIZE = 1 << 18
+
+
+# Fixed-size transposition table indexed by the low bits of the Zobrist hash.
+# Each slot holds (hash, depth, flag, value, move, generation).
+# Replacement policy: a slot is overwritten if it is empty, was written by an
+# older search (generation), or holds a result searched no deeper than the new one.
+class TranspositionTable:
+    # Input: int size = number of slots, rounded down to a power of 2
+    def __init__(self, size=TT_SIZE):
+        self.size = 1 << (max(1, int(size)).bit_length() - 1)
+        self.mask = self.size - 1
+        self.clear()
+
+    def clear(self):
+        self.slots = [None] * self.size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    # Call once per root search so older entries become replaceable.
+    def new_search(self):
+        self.generation += 1
+
+    # Return: (int depth, int flag, int value, int move) or None if not stored
+    def probe(self, key):
+        self.probes += 1
+        entry = self.slots[key & self.mask]
+        if entry is None or entry[0] != key:
+            return None
+        self.hits += 1
+        return entry[1:5]
+
+    def store(self, key, depth, flag, value, move):
+        i = key & self.mask
+        entry = self.slots[i]
+        if entry is None or entry[5] != self.generation or entry[1] <= depth or entry[0] == key:
+            self.slots[i] = (key, depth, flag, value, move, self.generation)
+            self.stores += 1
+
+
+# Raised inside minimax once the deadline of a timed search has passed
+class SearchTimeout(Exception):
+    pass
+
+
+# One table per (agent ID, heuristic, connect #), kept for the whole process
+# so it persists across the moves of a game; tournament.play_one empties it
+# before every game.
+tables = {}
+
+
+# Input: int  n = agent ID the scores are relative to
+#        func h = heuristic the leaf scores came from
+#        int  w = connect #
+# Return: TranspositionTable
+def get_table(n, h, w, size=TT_SIZE):
+    if (n, h, w) not in tables:
+        tables[(n, h, w)] = TranspositionTable(size)
+    return tables[(n, h, w)]
+
+
+# Column order for a board with c columns, center first
+center_orders = {}
+
+
+def center_order(c):
+    if c not in center_orders:
+        center_orders[c] = sorted(range(c), key=lambda col: abs(2*col - (c-1)))
+    return center_orders[c]
+
+
+# Whether heuristic h scores a board and its left-right mirror the same.
+# Heuristics are assumed to unless they set h.symmetric = False; only
+# symmetric ones share table entries between mirrored positions.
+def is_symmetric(h):
+    return getattr(h, 'symmetric', True)
+
+
+# Table key of pos and whether moves in the table are stored mirrored
+# Input: Bitboard pos
+#        bool mirror = share one entry between pos and its mirror
+# Return: (int key, bool flip)
+def table_key(pos, mirror):
+    if mirror and pos.is_mirrored():
+        return pos.mirror_hash, True
+    return pos.hash, False
+
+
+# Whether heuristic h accepts an optional keyword argument
+# state = a lines.LineState, see SearchContext.begin
+# pos = the Bitboard being scored, see evalcache.EvalCache
+state_support = {}
+
+
+def takes_argument(h, name):
+    if (h, name) not in state_support:
+        try:
+            state_support[(h, name)] = name in inspect.signature(h).parameters
+        except (TypeError, ValueError):
+            state_support[(h, name)] = False
+    return state_support[(h, name)]
+
+
+def takes_state(h):
+    return takes_argument(h, 'state')
+
+
+# Everything one root search carries besides the position: the table, the
+# deadline, the move-ordering memory and the node count.
+class SearchContext:
+    # Input: TranspositionTable tt = table to read and fill, or None
+    #        float deadline = time.time() after which SearchTimeout is raised, or None
+    #        bool ordered = order moves (pv, table move, killers, history,
+    #                       center first); False shuffles every node instead
+    #        stats.SearchStats stats = filled in as the search goes, or None
+    def __init__(self, tt=None, deadline=None, ordered=True, stats=None):
+        self.tt = tt
+        self.deadline = deadline
+        self.ordered = ordered
+        self.stats = stats
+        # killers[ply] = the last 2 moves that caused a cutoff at that ply
+        self.killers = {}
+        # history[player-1][column] = cutoffs caused, weighted by depth^2
+        self.history = None
+        self.nodes = 0
+        self.root_ply = None
+        # lines.LineState for heuristics that take one, see begin
+        self.state = None
+        # Key mirrored positions alike in the table, see table_key
+        self.mirror = True
+        # Pass the position to the heuristic, see begin
+        self.pass_pos = False
+
+    # Called by minimax on the first node it searches with this context.
+    # Heuristics with a state parameter get a lines.LineState that play/undo
+    # keep up to date, so leaves are scored without rescanning the board.
+    def begin(self, pos, h):
+        self.root_ply = len(pos.moves)
+        self.mirror = is_symmetric(h)
+        self.pass_pos = takes_argument(h, 'pos')
+        if takes_state(h):
+            self.state = lines.LineState(pos.to_array(), pos.w)
+
+    # Order the legal moves of pos, best guess first.
+    # Input: Bitboard pos
+    #        int tt_move = best move stored in the table, or None
+    #        int[] pv = principal variation from this node, or None
+    # Return: int[] = legal moves
+    def order(self, pos, tt_move, pv):
+        play = [col for col in center_order(pos.c) if pos.heights[col] < pos.r]
+        if not self.ordered:
+            # Make the moves non-deterministic
+            # Given non-perfect heuristics
+            np.random.shuffle(play)
+            return play
+        ply = len(pos.moves)
+        if ply == self.root_ply:
+            # Randomness only breaks ties at the root: columns the same
+            # distance from the center come in random order
+            np.random.shuffle(play)
+            play.sort(key=lambda col: abs(2*col - (pos.c-1)))
+        if self.history is not None:
+            hist = self.history[pos.turn-1]
+            play.sort(key=lambda col: -hist[col])
+        # Killers, then the table move, then the pv move end up in front
+        for col in reversed(self.killers.get(ply, ())):
+            if col in play:
+                play.remove(col)
+                play.insert(0, col)
+        for col in (tt_move, pv[0] if pv else None):
+            if col is not None and col in play:
+                play.remove(col)
+                play.insert(0, col)
+        return play
+
+    # Remember a move that caused a cutoff at depth d
+    def cutoff(self, pos, col, d):
+        if self.stats is not None:
+            self.stats.cutoff(len(pos.moves) - self.root_ply)
+        if not self.ordered:
+            return
+        ply = len(pos.moves)
+        killers = self.killers.get(ply, [])
+        if col not in killers:
+            self.killers[ply] = [col] + killers[:1]
+        if self.history is None:
+            self.history = [[0] * pos.c, [0] * pos.c]
+        self.history[pos.turn-1][col] += d * d
+
+
+# Minimax with Alpha-beta pruning on a bitboard, using play/undo instead of board copies.
+# The side to move at the root is given by pos.turn; agent_minimax sets it to
+# the opponent, so the root ply picks the column the opponent would like most.
+# Input: Bitboard pos = position to search, restored before returning unless
+#                       the deadline of ctx passes (SearchTimeout)
+#        int     n = agent ID (as shown on board) playing FOR
+#        func    h = the heuristic function to evaluate a board
+#        int     d = depth limit
+#      alpha, beta = the alpha and beta as in ab-pruning
+#              ctx = SearchContext; a plain ordered search without a table if None
+#               pv = moves from this node that are searched first, ply by ply
+# Return: (int column, int value)
+def minimax(pos, n, h, d, alpha=-WIN_SCORE, beta=WIN_SCORE, ctx=None, pv=None):
+    if ctx is None:
+        ctx = SearchContext()
+    if ctx.root_ply is None:
+        ctx.begin(pos, h)
+    ctx.nodes += 1
+    st = ctx.stats
+    if st is not None:
+        st.node(len(pos.moves) - ctx.root_ply)
+    if ctx.deadline is not None and time.time() > ctx.deadline:
+        raise SearchTimeout()
+
+    # The last move ended the game?
+    if pos.winner != 0:
+        if pos.winner == n:
+            return None, WIN_SCORE
+        elif pos.winner == 3:
+            return None, 0
+        return None, -WIN_SCORE
+
+    tt = ctx.tt
+    tt_move = None
+    if tt is not None:
+        key, flip = table_key(pos, ctx.mirror)
+        entry = tt.probe(key)
+        if entry is not None:
+            if st is not None:
+                st.tt_hits += 1
+            depth, flag, value, tt_move = entry
+            if flip:
+                tt_move = pos.canonical_move(tt_move)
+            if len(pos.moves) == ctx.root_ply:
+                # Neither cut off nor put first at the root: the table would
+                # replay its last pick, and the random tie-break never be used
+                tt_move = None
+            elif depth >= d and (flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha)):
+                return tt_move, value
+
+    # Depth limit reached, resorting to heuristics
+    state = ctx.state
+    if d == 0:
+        if st is not None:
+            start = time.perf_counter()
+        if ctx.pass_pos:
+            value = h(None, n, pos.w, state=state, pos=pos)
+        elif state is not None:
+            value = h(None, n, pos.w, state=state)
+        else:
+            value = h(pos.to_array(), n, pos.w)
+        if st is not None:
+            st.leaves += 1
+            st.heuristic_time += time.perf_counter() - start
+        if tt is not None:
+            tt.store(key, 0, EXACT, value, None)
+        return None, value
+
+    if st is not None:
+        start = time.perf_counter()
+        play = ctx.order(pos, tt_move, pv)
+        st.movegen_time += time.perf_counter() - start
+    else:
+        play = ctx.order(pos, tt_move, pv)
+    alpha_orig = alpha
+    beta_orig = beta
+    column = play[0]
+    if pos.turn == n:
+        value = -WIN_SCORE
+        for c in play:
+            pos.play(c)
+            if state is not None:
+                state.play(c, pos.heights[c]-1, 3 - pos.turn)
+            new_score = minimax(pos, n, h, d - 1, alpha, beta, ctx, pv[1:] if pv and c == pv[0] else None)[1]
+            pos.undo()
+            if state is not None:
+                state.undo(c, pos.heights[c], pos.turn)
+            if new_score > value:
+                value = new_score
+                # Make 'column' the best scoring column we can get
+                column = c
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                ctx.cutoff(pos, c, d)
+                break
+    else:
+        value = WIN_SCORE
+        for c in play:
+            pos.play(c)
+            if state is not None:
+                state.play(c, pos.heights[c]-1, 3 - pos.turn)
+            new_score = minimax(pos, n, h, d - 1, alpha, beta, ctx, pv[1:] if pv and c == pv[0] else None)[1]
+            pos.undo()
+            if state is not None:
+                state.undo(c, pos.heights[c], pos.turn)
+            if new_score < value:
+                value = new_score
+                column = c
+            beta = min(beta, value)
+            if alpha >= beta:
+                ctx.cutoff(pos, c, d)
+                break
+
+    if tt is not None:
+        if value <= alpha_orig:
+            flag = UPPER
+        elif value >= beta_orig:
+            flag = LOWER
+        else:
+            flag = EXACT
+        tt.store(key, d, flag, value, pos.canonical_move(column) if flip else column)
+    return column, value
+
+
+# Follow the best moves stored in the table from pos.
+# Input: Bitboard pos = position the line starts from, restored before returning
+#        TranspositionTable tt
+#        int depth = longest line to return
+#        bool mirror = the table was filled with mirrored keys, see table_key
+# Return: int[] = the principal variation
+def principal_variation(pos, tt, depth, mirror=False):
+    pv = []
+    while len(pv) < depth and pos.winner == 0:
+        key, flip = table_key(pos, mirror)
+        entry = tt.probe(key)
+        if entry is None or entry[3] is None:
+            break
+        col = pos.canonical_move(entry[3]) if flip else entry[3]
+        if not pos.can_play(col):
+            break
+        pv.append(col)
+        pos.play(col)
+    for _ in pv:
+        pos.undo()
+    return pv
+
+
+# Iterative deepening: search depth 1, 2, 3, ... until the deadline and keep
+# the result of the last depth that finished. Each iteration searches the
+# previous principal variation first.
+# Input: Bitboard pos = position to search, left untouched
+#        int     n = agent ID (as shown on board) playing FOR
+#        func    h = the heuristic function to evaluate a board
+#        float   seconds = time budget
+#        TranspositionTable tt
+#        int     max_depth = stop after this depth; the number of empty cells if None
+#        stats.SearchStats stats = filled in by every iteration, or None
+# Return: (int column, int value, int depth) depth = last completed depth;
+#         column is a random legal move if not even depth 1 finished
+def iterative_deepening(pos, n, h, seconds, tt, max_depth=None, stats=None):
+    ctx = SearchContext(tt, time.time() + seconds, stats=stats)
+    if max_depth is None:
+        max_depth = pos.free
+    column = int(np.random.choice(pos.legal_moves()))
+    value = 0
+    depth = 0
+    pv = []
+    for d in range(1, max_depth + 1):
+        try:
+            column, value = minimax(pos.copy(), n, h, d, ctx=ctx, pv=pv)
+        except SearchTimeout:
+            break
+        depth = d
+        # A forced result will not change with more depth
+        if abs(value) >= WIN_SCORE:
+            break
+        pv = principal_variation(pos, tt, d, ctx.mirror)
+    return column, value, depth
@@ -0,0 +1,171 @@
+# Perfect-play solver of the Connect-4 project
+# Negamax with alpha-beta on a bitboard, driven by null-window searches, with
+# the positions it has proven kept in a transposition table. The table is
+# keyed by the canonical hash, so a position and its mirror share one entry.
+#
+# Scores are from the view of the player to move, counted in their own
+# pieces: winning with your k-th last piece scores k, so faster wins score
+# higher; a draw is 0 and a loss is the negative of the opponent's win.
+
+import time
+
+import search
+from bitboard import connected
+from search import TranspositionTable, SearchTimeout, LOWER, UPPER
+
+# The clock is read every CLOCK_MASK+1 nodes; at 50-80 us a node on large
+# boards, that is a few ms past the deadline at most
+CLOCK_MASK = 63
+
+
+# Score of the player to move if they win with the next piece
+# Input: int free = number of empty cells before that piece
+def win_score(free):
+    return (free + 1) // 2
+
+
+class Solver:
+    # Input: TranspositionTable tt = proven bounds, shared across solves
+    def __init__(self, tt=None):
+        if tt is None:
+            tt = TranspositionTable()
+        self.tt = tt
+        self.nodes = 0
+        self.deadline = None
+
+    # Columns of pos where the player to move would complete a line
+    def winning_columns(self, pos, n):
+        p = pos.pieces[n-1]
+        play = []
+        for col in pos.legal_moves():
+            if connected(p | (1 << (col * pos.h + pos.heights[col])), pos.w, pos.shifts):
+                play.append(col)
+        return play
+
+    # Moves that do not hand the opponent an immediate win, center first.
+    # Return: (int[] play, bool lost) lost = every move loses at once
+    def safe_moves(self, pos):
+        threats = self.winning_columns(pos, 3 - pos.turn)
+        if len(threats) > 1:
+            # Two open threats cannot both be blocked
+            return [], True
+        play = threats if threats else [col for col in search.center_order(pos.c) if pos.heights[col] < pos.r]
+        # Do not fill the cell right under an opponent's winning cell
+        p = pos.pieces[2 - pos.turn]
+        safe = []
+        for col in play:
+            above = pos.heights[col] + 1
+            if above < pos.r and connected(p | (1 << (col * pos.h + above)), pos.w, pos.shifts):
+                continue
+            safe.append(col)
+        return safe, not safe
+
+    # Negamax with alpha-beta; the game must not be over.
+    # Input: Bitboard pos = position to search, restored before returning
+    #                       unless the deadline passes (SearchTimeout)
+    #        int alpha, beta = search window
+    # Return: int score, exact if alpha < score < beta, otherwise a bound
+    def negamax(self, pos, alpha, beta):
+        self.nodes += 1
+        if self.deadline is not None and self.nodes & CLOCK_MASK == 0 and time.time() > self.deadline:
+            raise SearchTimeout()
+        free = pos.free
+        if self.winning_columns(pos, pos.turn):
+            return win_score(free)
+        play, lost = self.safe_moves(pos)
+        if lost:
+            # The opponent wins with their next piece
+            return -win_score(free - 1)
+        if free <= 2:
+            # One move each and neither can win
+            return 0
+
+        # Cannot win with the next 2 pieces, and the opponent cannot win with their next one
+        upper = win_score(free - 2)
+        lower = -win_score(free - 3)
+        entry = self.tt.probe(pos.canonical_hash())
+        if entry is not None:
+            _, flag, value, _ = entry
+            if flag == UPPER:
+                upper = min(upper, value)
+            else:
+                lower = max(lower, value)
+        if lower >= beta:
+            return lower
+        if upper <= alpha:
+            return upper
+        alpha = max(alpha, lower)
+        beta = min(beta, upper)
+
+        best = None
+        for col in play:
+            pos.play(col)
+            score = -self.negamax(pos, -beta, -alpha)
+            pos.undo()
+            if score >= beta:
+                self.tt.store(pos.canonical_hash(), free, LOWER, score, pos.canonical_move(col))
+                return score
+            if score > alpha:
+                alpha = score
+                best = col
+        self.tt.store(pos.canonical_hash(), free, UPPER, alpha, pos.canonical_move(best))
+        return alpha
+
+    # Exact score of pos, narrowed down with null-window searches.
+    # Input: Bitboard pos = position whose game is not over, left untouched
+    #        float deadline = time.time() after which SearchTimeout is raised, or None
+    # Return: int score
+    def solve(self, pos, deadline=None):
+        self.deadline = deadline
+        self.tt.new_search()
+        pos = pos.copy()
+        lo = -win_score(pos.free - 1)
+        hi = win_score(pos.free)
+        while lo < hi:
+            # Probe near 0 first, then halve towards the ends
+            med = lo + (hi - lo) // 2
+            if med <= 0 and int(lo / 2) < med:
+                med = int(lo / 2)
+            elif med >= 0 and int(hi / 2) > med:
+                med = int(hi / 2)
+            score = self.negamax(pos, med, med + 1)
+            if score <= med:
+                hi = score
+            else:
+                lo = score
+        return lo
+
+    # Best move of pos and its score; ties go to the more central column.
+    # Input: Bitboard pos = position whose game is not over, left untouched
+    #        float deadline = time.time() after which SearchTimeout is raised, or None
+    # Return: (int column, int score)
+    def best_move(self, pos, deadline=None):
+        win = self.winning_columns(pos, pos.turn)
+        if win:
+            return min(win, key=lambda col: abs(2*col - (pos.c-1))), win_score(pos.free)
+        column = None
+        best = None
+        pos = pos.copy()
+        for col in search.center_order(pos.c):
+            if not pos.can_play(col):
+                continue
+            pos.play(col)
+            if pos.winner == 3:
+                score = 0
+            else:
+                score = -self.solve(pos, deadline)
+            pos.undo()
+            if best is None or score > best:
+                column = col
+                best = score
+        return column, best
+
+
+# One solver per (c, r, w); proven bounds do not depend on who is asking
+solvers = {}
+
+
+def get_solver(c, r, w, size=search.TT_SIZE):
+    if (c, r, w) not in solvers:
+        solvers[(c, r, w)] = Solver(TranspositionTable(size))
+    return solvers[(c, r, w)]
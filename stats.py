@@ -0,0 +1,112 @@
+# Search instrumentation of the Connect-4 project
+# A SearchStats is filled in by the agents while they choose a move: nodes,
+# leaf evaluations, cutoffs by ply, time in the heuristic and in move
+# ordering, MCTS simulations and playouts. Agents keep the signature
+# algo(b, n, w, h, d), so the stats object they fill in is the module-level
+# current one, set by whoever is collecting (see game.Game) and None otherwise;
+# when it is None the searches skip all bookkeeping.
+# Stats of several moves, games or pairs are combined with merge.
+
+# The SearchStats agents fill in, or None when nobody is collecting
+current = None
+
+
+# Make s the stats agents fill in from now on.
+# Input: SearchStats s, or None to stop collecting
+# Return: SearchStats = the previous one, to restore afterwards
+def collect(s):
+    global current
+    previous = current
+    current = s
+    return previous
+
+
+class SearchStats:
+    def __init__(self):
+        # Agent calls (moves) these stats cover
+        self.moves = 0
+        # Seconds spent in the agents, and in the slowest single move
+        self.time = 0.0
+        self.max_move_time = 0.0
+        # Minimax
+        self.nodes = 0
+        self.leaves = 0
+        self.tt_hits = 0
+        # nodes_by_ply[k] = nodes searched k plies below the root
+        self.nodes_by_ply = {}
+        # cutoffs[k] = alpha-beta cutoffs k plies below the root
+        self.cutoffs = {}
+        # Sum of the depths searched; divide by moves for the average
+        self.depth = 0
+        self.heuristic_time = 0.0
+        self.movegen_time = 0.0
+        # MCTS: iterations' worth of simulations, and games actually played out
+        self.simulations = 0
+        self.playouts = 0
+
+    def node(self, ply):
+        self.nodes += 1
+        self.nodes_by_ply[ply] = self.nodes_by_ply.get(ply, 0) + 1
+
+    def cutoff(self, ply):
+        self.cutoffs[ply] = self.cutoffs.get(ply, 0) + 1
+
+    # Record one agent call that took seconds
+    def move(self, seconds):
+        self.moves += 1
+        self.time += seconds
+        self.max_move_time = max(self.max_move_time, seconds)
+
+    # Effective branching factor: the geometric mean growth in nodes from one
+    # ply to the next, over the deepest ply reached.
+    # Return: float, 0 if nothing below the root was searched
+    def branching_factor(self):
+        plies = [k for k, v in self.nodes_by_ply.items() if v > 0 and k > 0]
+        if not plies or not self.nodes_by_ply.get(0):
+            return 0.0
+        deepest = max(plies)
+        return (self.nodes_by_ply[deepest] / self.nodes_by_ply[0]) ** (1.0 / deepest)
+
+    # Add the counts of other into these stats.
+    def merge(self, other):
+        for name in ('moves', 'time', 'nodes', 'leaves', 'tt_hits', 'depth', 'heuristic_time', 'movegen_time', 'simulations', 'playouts'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.max_move_time = max(self.max_move_time, other.max_move_time)
+        for k, v in other.nodes_by_ply.items():
+            self.nodes_by_ply[k] = self.nodes_by_ply.get(k, 0) + v
+        for k, v in other.cutoffs.items():
+            self.cutoffs[k] = self.cutoffs.get(k, 0) + v
+        return self
+
+    # Return: dict = every count, plus branching_factor; fit for JSON and
+    #         for sending between processes
+    def as_dict(self):
+        d = dict(self.__dict__)
+        d['nodes_by_ply'] = dict(self.nodes_by_ply)
+        d['cutoffs'] = dict(self.cutoffs)
+        d['branching_factor'] = self.branching_factor()
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        s = cls()
+        for name, value in d.items():
+            if name in s.__dict__:
+                setattr(s, name, value)
+        # JSON turns the ply keys into strings
+        s.nodes_by_ply = {int(k): v for k, v in s.nodes_by_ply.items()}
+        s.cutoffs = {int(k): v for k, v in s.cutoffs.items()}
+        return s
+
+    # Return: str = one line for printing
+    def summary(self):
+        moves = max(self.moves, 1)
+        parts = [f'{self.moves} moves, {self.time/moves:.4f}s/move (max {self.max_move_time:.4f}s)']
+        if self.nodes:
+            parts.append(f'{self.nodes/moves:.0f} nodes/move, {self.leaves/moves:.0f} leaves/move, '
+                         f'{sum(self.cutoffs.values())/moves:.0f} cutoffs/move, '
+                         f'branching {self.branching_factor():.2f}, depth {self.depth/moves:.1f}, '
+                         f'heuristic {self.heuristic_time:.3f}s, ordering {self.movegen_time:.3f}s')
+        if self.simulations:
+            parts.append(f'{self.simulations/moves:.0f} simulations/move, {self.playouts/moves:.0f} playouts/move')
+        return '; '.join(parts)
@@ -0,0 +1,25 @@
+# The project is a flat set of modules next to this folder
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bitboard import Bitboard
+
+
+# Positions of seeded random games that are not over yet.
+# Input: int count, int c, r, w = board shape, int low, high = plies played
+# Return: Bitboard[]
+def random_positions(count, c=7, r=6, w=4, low=0, high=30, seed=0):
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        pos = Bitboard(c, r, w)
+        for _ in range(rng.randint(low, high)):
+            if pos.winner != 0:
+                break
+            pos.play(rng.choice(pos.legal_moves()))
+        if pos.winner == 0:
+            positions.append(pos)
+    return positions
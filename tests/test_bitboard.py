@@ -0,0 +1,92 @@
+import random
+
+import numpy as np
+import pytest
+
+import baseline
+import helper
+from bitboard import Bitboard
+from conftest import random_positions
+
+SHAPES = [(7, 6, 4), (5, 4, 3), (9, 7, 5), (12, 10, 6)]
+
+
+@pytest.mark.parametrize('c, r, w', SHAPES)
+def test_moves_follow_the_board(c, r, w):
+    rng = random.Random(c * 100 + r)
+    for _ in range(20):
+        pos = Bitboard(c, r, w)
+        while pos.winner == 0:
+            pos.play(rng.choice(pos.legal_moves()))
+            available, tops = baseline.get_avalible_column(pos.to_array())
+            assert pos.legal_moves() == np.flatnonzero(available).tolist()
+            assert [pos.heights[col] for col in pos.legal_moves()] == tops[available].tolist()
+        while pos.moves:
+            pos.undo()
+        assert (pos.pieces, pos.winner, pos.free) == ([0, 0], 0, c * r)
+
+
+@pytest.mark.parametrize('c, r, w', SHAPES)
+def test_winner_follows_the_board(c, r, w):
+    rng = random.Random(c * 100 + r)
+    for _ in range(20):
+        pos = Bitboard(c, r, w)
+        while pos.winner == 0:
+            pos.play(rng.choice(pos.legal_moves()))
+            b = pos.to_array()
+            assert pos.winner == baseline.get_winner(b, w) == helper.get_winner(b, w)
+        while pos.moves:
+            pos.undo()
+            assert pos.winner == 0
+
+
+@pytest.mark.parametrize('c, r, w', SHAPES)
+def test_hash_follows_the_board(c, r, w):
+    rng = random.Random(c * 100 + r)
+    for _ in range(20):
+        pos = Bitboard(c, r, w)
+        start = pos.hash
+        while pos.winner == 0:
+            pos.play(rng.choice(pos.legal_moves()))
+            assert pos.hash == Bitboard.from_array(pos.to_array(), w, turn=pos.turn).hash
+        while pos.moves:
+            pos.undo()
+        assert pos.hash == start
+
+
+@pytest.mark.parametrize('c, r, w', SHAPES)
+def test_mirror_hash_follows_the_board(c, r, w):
+    rng = random.Random(c * 100 + r)
+    for _ in range(20):
+        pos = Bitboard(c, r, w)
+        start = pos.mirror_hash
+        while pos.winner == 0:
+            pos.play(rng.choice(pos.legal_moves()))
+            mirror = Bitboard.from_array(pos.to_array()[::-1], w, turn=pos.turn)
+            assert pos.mirror_hash == mirror.hash
+            assert pos.canonical_hash() == mirror.canonical_hash()
+        while pos.moves:
+            pos.undo()
+        assert pos.mirror_hash == start
+
+
+def test_array_round_trip():
+    rng = np.random.RandomState(1)
+    for c, r in ((7, 6), (12, 10)):
+        b = rng.randint(0, 3, size=(c, r))
+        # Gravity: every column is filled from the bottom
+        b = np.sort(b != 0, axis=1)[:, ::-1] * b
+        pos = Bitboard.from_array(b, 4)
+        assert np.array_equal(pos.to_array(), b)
+
+
+def test_shapes_do_not_share_hashes():
+    assert Bitboard(7, 6, 4).hash != Bitboard(9, 7, 4).hash
+    assert Bitboard(4, 5, 4).hash != Bitboard(6, 3, 4).hash
+
+
+def test_set_turn_keeps_the_hashes():
+    for pos in random_positions(10, high=20, seed=9):
+        flipped = Bitboard.from_array(pos.to_array(), pos.w, turn=3 - pos.turn)
+        pos.set_turn(3 - pos.turn)
+        assert (pos.turn, pos.hash, pos.mirror_hash) == (flipped.turn, flipped.hash, flipped.mirror_hash)
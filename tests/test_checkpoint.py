@@ -0,0 +1,70 @@
+import json
+import os
+
+import pytest
+
+import checkpoint
+import tournament
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'run.json')
+    saved = checkpoint.Checkpoint(path, {'seed': 1})
+    assert not saved.load()
+    saved.add((0, 1, 2, 0.5, None))
+    saved.state['offset'] = 10
+    saved.save()
+    again = checkpoint.Checkpoint(path, {'seed': 1})
+    assert again.load()
+    assert (again.games, again.state) == ([[0, 1, 2, 0.5, None]], {'offset': 10})
+    # A checkpoint of another run is never resumed
+    with pytest.raises(ValueError):
+        checkpoint.Checkpoint(path, {'seed': 2}).load()
+    again.remove()
+    assert not os.path.exists(path)
+
+
+# Stands in for the process dying: nothing catches it
+class Crash(BaseException):
+    pass
+
+
+def run(**kwargs):
+    return tournament.run_tournament(['agent_minimax'], ['h_offense', 'h_center_control'], 7, 6, 4, 2, 3, workers=1, **kwargs)
+
+
+def recorded_pairs():
+    with open('game_data_tournament.jsonl', encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    return [(row['Agent 1'], row['Heuristic 1'], row['Agent 2'], row['Heuristic 2']) for row in rows]
+
+
+def test_resume_plays_the_uninterrupted_run(tmp_path, monkeypatch):
+    (tmp_path / 'full').mkdir()
+    (tmp_path / 'resumed').mkdir()
+    monkeypatch.chdir(tmp_path / 'full')
+    full = run()
+
+    monkeypatch.chdir(tmp_path / 'resumed')
+    save = checkpoint.Checkpoint.save
+    calls = []
+
+    # The first pair is checkpointed; the run dies once the second pair's row
+    # is written, before the checkpoint holding its games is
+    def save_once(self):
+        calls.append(self)
+        if len(calls) > 1:
+            raise Crash()
+        save(self)
+
+    monkeypatch.setattr(checkpoint.Checkpoint, 'save', save_once)
+    with pytest.raises(Crash):
+        run(checkpoint_path='run.json')
+    assert len(recorded_pairs()) == 2
+    monkeypatch.setattr(checkpoint.Checkpoint, 'save', save)
+    resumed = run(checkpoint_path='run.json', resume=True)
+
+    assert [row[:5] for row in resumed] == [row[:5] for row in full]
+    # The second pair is not recorded twice
+    assert recorded_pairs() == [row[:4] for row in full]
+    assert not os.path.exists('run.json')
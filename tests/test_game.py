@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import agents
+import game
+import heuristics
+from bitboard import Bitboard
+
+
+def test_result_replays_to_the_final_board():
+    for seed in range(5):
+        np.random.seed(seed)
+        result = game.play_game(agents.agent_random, heuristics.h_zero, agents.agent_minimax, heuristics.h_offense, game.GameConfig(max_depth=2))
+        pos = Bitboard(7, 6, 4)
+        for col in result.moves:
+            pos.play(col)
+        assert np.array_equal(pos.to_array(), result.board)
+        assert pos.winner == result.winner != 0
+        assert len(result.move_times) == len(result.moves)
+        assert result.stats is None
+
+
+def test_moves_and_stats_stay_in_step():
+    g = game.Game(agents.agent_minimax, heuristics.h_offense, agents.agent_minimax, heuristics.h_offense, game.GameConfig(5, 4, 3, max_depth=2, collect_stats=True))
+    g.step()
+    # A move made for the agent, not chosen through ask
+    g.play(0)
+    g.step()
+    assert len(g.moves) == len(g.move_times) == len(g.move_stats) == 3
+    assert g.next == 2
+    g.backtrack(0, g.moves[-1])
+    assert len(g.moves) == len(g.move_times) == len(g.move_stats) == 1
+    result = g.run()
+    assert len(result.moves) == len(result.move_stats)
+
+
+def test_illegal_move_is_refused():
+    g = game.Game(agents.agent_random, heuristics.h_zero, agents.agent_random, heuristics.h_zero, game.GameConfig(4, 2, 3))
+    g.play(1)
+    g.play(1)
+    with pytest.raises(ValueError):
+        g.play(1)
+    assert g.moves == [1, 1]
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+import baseline
+import heuristics
+import lines
+from conftest import random_positions
+
+
+@pytest.mark.parametrize('name', sorted(heuristics.HEURISTICS))
+def test_heuristics_match_baseline(name):
+    if not hasattr(baseline, name):
+        pytest.skip('no baseline version')
+    h = heuristics.HEURISTICS[name]
+    reference = getattr(baseline, name)
+    for k, pos in enumerate(random_positions(30, high=35, seed=1)):
+        b = pos.to_array()
+        n = 1 + k % 2
+        assert h(b.copy(), n, 4) == reference(b.copy(), n, 4)
+
+
+def test_center_control_on_other_widths():
+    for c in (4, 7, 9, 12):
+        b = np.zeros([c, 5], dtype=int)
+        assert heuristics.h_center_control(b, 1, 4) == sum(2 + min(col, c-1-col) for col in range(c))
+    assert heuristics.h_center_control(np.zeros([7, 6], dtype=int), 1, 4) == sum([2, 3, 4, 5, 4, 3, 2])
+
+
+@pytest.mark.parametrize('c, r, w', [(7, 6, 4), (9, 7, 5), (12, 10, 6)])
+def test_line_state_matches_full_scan(c, r, w):
+    for pos in random_positions(5, c, r, w, high=40, seed=2):
+        state = lines.LineState(np.zeros([c, r], dtype=int), w)
+        replay = type(pos)(c, r, w)
+        for col in pos.moves:
+            state.play(col, replay.heights[col], replay.turn)
+            replay.play(col)
+        b = pos.to_array()
+        for f in (lines.offense_line, lines.defense_line, lines.sliding_windows_line):
+            for n in (1, 2):
+                assert state.total(f, n) == lines.line_score(b, f, n, w)
+        assert state.total(lines.sliding_windows_line, 1) == lines.sliding_windows_score(b, 1, w)
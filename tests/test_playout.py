@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+import playout
+from conftest import random_positions
+
+
+# Boards that fit in 64 bits, so both paths can play them
+@pytest.mark.parametrize('c, r, w', [(7, 6, 4), (8, 7, 5), (5, 4, 3)])
+def test_cell_playout_matches_bitboard_playout(c, r, w):
+    positions = random_positions(20, c, r, w, high=12, seed=5)
+    games = 50
+    winners = np.array([p.winner for p in positions], dtype=np.int8).repeat(games)
+    bits = playout.batch_playout(positions, games, np.random.RandomState(6))
+    cells = playout.cell_playout(positions, games, np.random.RandomState(6), winners)
+    assert np.array_equal(bits, cells)
+
+
+def test_large_boards_play_to_the_end():
+    positions = random_positions(4, 12, 10, 6, high=30, seed=7)
+    winners = playout.batch_playout(positions, 20, np.random.RandomState(8))
+    assert len(winners) == 80
+    assert set(winners.tolist()) <= {1, 2, 3}
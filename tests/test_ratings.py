@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+import ratings
+from ratings import START, Ratings
+
+
+def test_add():
+    rating = Ratings()
+    rating.add('a', 'b', 1)
+    rating.add('b', 'a', 3)
+    rating.add('c', 'a', 2)
+    assert rating.elo['a'] > START > rating.elo['b']
+    # Elo only moves points between the two players
+    assert sum(rating.elo.values()) == pytest.approx(3 * START)
+    # Keyed by the sorted pair, points of its first player
+    assert rating.pairs[('a', 'b')] == [1.5, 2]
+    assert rating.pairs[('a', 'c')] == [1.0, 1]
+    assert (rating.played('b', 'a'), rating.games('a'), rating.games('c')) == (2, 3, 1)
+    bt = rating.bradley_terry()
+    assert bt['a'] > bt['b'] and bt['a'] > bt['c']
+    assert sum(bt.values()) / 3 == pytest.approx(START)
+
+
+def test_pick():
+    rating = Ratings()
+    players = ['a', 'b', 'c']
+    # Nobody played: the first pair
+    assert rating.pick(players) == ('a', 'b')
+    rating.add('a', 'b', 3)
+    assert rating.pick(players) == ('a', 'c')
+    # Games started count as played; the two take turns moving first
+    assert rating.pick(players, {('a', 'c'): 1, ('b', 'c'): 1}) == ('b', 'a')
+    for _ in range(10):
+        rating.add('a', 'c', 1)
+    # a and c are settled, b and c the most open
+    assert set(rating.pick(players)) == {'b', 'c'}
+
+
+def test_load_skips_a_half_written_line(tmp_path):
+    path = tmp_path / 'rated.jsonl'
+    row = {'Agent 1': 'x', 'Heuristic 1': 'h', 'Agent 2': 'y', 'Heuristic 2': 'h', 'Winner': 1}
+    path.write_text(json.dumps(row) + '\n' + json.dumps(row)[:20])
+    rating = ratings.load(str(path))
+    assert rating.played('x|h', 'y|h') == 1
@@ -0,0 +1,30 @@
+import json
+
+import results
+
+HEADERS = ['a', 'b']
+
+
+def test_rows_include_the_buffer(tmp_path):
+    sink = results.ResultsSink(str(tmp_path / 'rows.jsonl'), HEADERS, flush_every=2)
+    sink.add([1, 2])
+    assert sink.buffer and not (tmp_path / 'rows.jsonl').exists()
+    sink.add([3, 4])
+    assert not sink.buffer
+    sink.add([5, 6])
+    assert sink.rows() == [[1, 2], [3, 4], [5, 6]]
+    sink.close()
+    assert len((tmp_path / 'rows.jsonl').read_text().splitlines()) == 3
+
+
+# A run cut off in the middle of a write leaves half a line at the end
+def test_a_half_written_line_is_skipped(tmp_path):
+    path = tmp_path / 'rows.jsonl'
+    path.write_text(json.dumps({'a': 1, 'b': 2}) + '\n' + '{"a": 3, "b"')
+    sink = results.ResultsSink(str(path), HEADERS)
+    sink.add([5, 6])
+    sink.flush()
+    # Rows of the earlier run are not this sink's
+    assert sink.rows() == [[5, 6]]
+    sink.offset = 0
+    assert sink.rows() == [[1, 2], [5, 6]]
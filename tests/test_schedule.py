@@ -0,0 +1,41 @@
+import pytest
+
+from schedule import Z, AdaptiveSchedule, wilson_interval
+
+
+def test_wilson_interval():
+    assert wilson_interval(0, 0, Z[0.95]) == (0.0, 1.0)
+    low, high = wilson_interval(50, 100, Z[0.95])
+    assert low == pytest.approx(0.4038, abs=1e-4) and high == pytest.approx(0.5962, abs=1e-4)
+    assert wilson_interval(10, 10, Z[0.95])[1] == 1.0
+
+
+def test_settled():
+    s = AdaptiveSchedule(100, batch=10, min_games=20)
+    # Never before min_games, always at max_games
+    assert not s.settled([10, 0], 10)
+    assert s.settled([50, 50], 100)
+    # One side clearly better
+    assert s.settled([18, 2], 20)
+    assert s.settled([2, 18], 20)
+    # Close, and not known well enough yet
+    assert not s.settled([11, 9], 20)
+    # Only draws so far
+    assert s.settled([0, 0], 20)
+
+
+def test_close_pairs_settle_on_precision():
+    s = AdaptiveSchedule(1000, min_games=20, precision=20.0)
+    games = next(n for n in range(20, 1000, 2) if s.settled([n // 2, n // 2], n))
+    low, high = s.interval([games // 2, games // 2])
+    before = s.interval([games // 2 - 1, games // 2 - 1])
+    assert high - low <= 0.2 < before[1] - before[0]
+
+
+def test_next_batch():
+    s = AdaptiveSchedule(25, batch=10, min_games=20)
+    assert s.next_batch([0, 0], 0) == 10
+    assert s.next_batch([11, 9], 20) == 5
+    assert s.next_batch([20, 0], 20) == 0
+    # Less settled pairs come first
+    assert s.priority([11, 9]) > s.priority([19, 1])
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+import agents
+import evalcache
+import game
+import heuristics
+import parallel
+import search
+from conftest import random_positions
+from search import WIN_SCORE, SearchContext, TranspositionTable
+
+
+# Full-width minimax without pruning, tables or move ordering
+def reference(pos, n, h, d):
+    if pos.winner != 0:
+        if pos.winner == n:
+            return WIN_SCORE
+        return 0 if pos.winner == 3 else -WIN_SCORE
+    if d == 0:
+        return h(pos.to_array(), n, pos.w)
+    values = []
+    for col in pos.legal_moves():
+        pos.play(col)
+        values.append(reference(pos, n, h, d - 1))
+        pos.undo()
+    return max(values) if pos.turn == n else min(values)
+
+
+# The root of agent_minimax: the opponent of n to move
+def roots(count, seed):
+    found = []
+    for pos in random_positions(count, high=20, seed=seed):
+        n = pos.turn
+        pos.turn = 3 - n
+        found.append((pos, n))
+    return found
+
+
+@pytest.mark.parametrize('name', ['h_offense', 'h_sliding_windows', 'h_center_control', 'h_defense'])
+def test_minimax_value_with_and_without_table(name):
+    h = heuristics.HEURISTICS[name]
+    for pos, n in roots(6, seed=3):
+        expected = reference(pos.copy(), n, h, 3)
+        assert search.minimax(pos.copy(), n, h, 3)[1] == expected
+        tt = TranspositionTable(1 << 12)
+        assert search.minimax(pos.copy(), n, h, 3, ctx=SearchContext(tt))[1] == expected
+        # A second search over the same table
+        tt.new_search()
+        assert search.minimax(pos.copy(), n, h, 3, ctx=SearchContext(tt))[1] == expected
+        cached = evalcache.EvalCache(h)
+        assert search.minimax(pos.copy(), n, cached, 3, ctx=SearchContext(TranspositionTable(1 << 12)))[1] == expected
+
+
+# The table of one process outlives its games (search.get_table), and must not
+# replay its earlier picks over the random tie-break at the root
+def test_minimax_games_vary_across_seeds():
+    games = set()
+    for seed in range(10):
+        np.random.seed(seed)
+        result = game.play_game(agents.agent_minimax, heuristics.h_offense, agents.agent_minimax, heuristics.h_offense, game.GameConfig(max_depth=4))
+        games.add(tuple(result.moves))
+    assert len(games) > 1
+
+
+def test_parallel_minimax_plays_the_serial_move():
+    try:
+        for k, (pos, n) in enumerate(roots(6, seed=4)):
+            search.tables.clear()
+            np.random.seed(k)
+            expected = search.minimax(pos.copy(), n, heuristics.h_offense, 3, ctx=SearchContext(TranspositionTable(1 << 12)))
+            search.tables.clear()
+            np.random.seed(k)
+            assert parallel.parallel_minimax(pos.copy(), n, heuristics.h_offense, 3, workers=2) == expected
+    finally:
+        parallel.shutdown()
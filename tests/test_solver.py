@@ -0,0 +1,40 @@
+import pytest
+
+from conftest import random_positions
+from solver import Solver, win_score
+
+
+# Exact score of the player to move, by trying every game to the end
+def brute_force(pos, memo):
+    key = (pos.pieces[0], pos.pieces[1])
+    if key not in memo:
+        best = None
+        for col in pos.legal_moves():
+            free = pos.free
+            pos.play(col)
+            if pos.winner == 3 - pos.turn:
+                score = win_score(free)
+            elif pos.winner == 3:
+                score = 0
+            else:
+                score = -brute_force(pos, memo)
+            pos.undo()
+            if best is None or score > best:
+                best = score
+        memo[key] = best
+    return memo[key]
+
+
+@pytest.mark.parametrize('c, r, w', [(4, 4, 3), (5, 4, 3), (4, 5, 4)])
+def test_solver_matches_brute_force(c, r, w):
+    memo = {}
+    solver = Solver()
+    for pos in random_positions(15, c, r, w, low=4, high=10, seed=c * 10 + r):
+        expected = brute_force(pos.copy(), memo)
+        assert solver.solve(pos) == expected
+        col, score = solver.best_move(pos)
+        assert score == expected
+        child = pos.copy()
+        child.play(col)
+        if child.winner == 0:
+            assert -brute_force(child, memo) == expected
@@ -0,0 +1,19 @@
+import tournament
+
+
+# (agent1, h1, agent2, h2, c, r, w, max_depth, seed, eval_cache, collect_stats)
+def job(seed):
+    return ('agent_minimax', 'h_offense', 'agent_minimax', 'h_offense', 7, 6, 4, 3, seed, False, True)
+
+
+def nodes(game_stats):
+    return [s['nodes'] for s in game_stats]
+
+
+# A worker that played other games first has to play the same game
+def test_games_do_not_depend_on_earlier_games():
+    winner, _, first = tournament.play_one(job(5))
+    for seed in range(3):
+        tournament.play_one(job(seed))
+    again, _, second = tournament.play_one(job(5))
+    assert (again, nodes(second)) == (winner, nodes(first))
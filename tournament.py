@@ -0,0 +1,334 @@
+# Tournament runner of the Connect-4 project
+# Every (pair, game) job is sent to a pool of worker processes; results are
+# merged back into one winrate and average match time per pair, as main used
+# to compute them one game at a time. Pairs play a fixed number of games, or
+# stop early once their result is settled, see schedule.py.
+# run_rated instead rates every player from far fewer games, see ratings.py.
+
+import os
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+import agents
+import checkpoint
+import evalcache
+import game
+import helper
+import heuristics
+import mcts
+import ratings
+import results
+import search
+import solver
+import stats
+
+
+# Drop the search tables, MCTS trees and solver tables a process keeps
+# between games (see search.get_table, mcts.get_tree and solver.get_solver)
+def reset_state():
+    search.tables.clear()
+    mcts.trees.clear()
+    solver.solvers.clear()
+
+
+# Play one game without printing anything.
+# Input: (str agent1, str h1, str agent2, str h2, int c, int r, int w, int max_depth, int seed, bool eval_cache, bool collect_stats) job
+#        agents and heuristics are given by name so jobs can be sent to other processes
+#        eval_cache = memoize the heuristics, see evalcache.py; each worker
+#                     keeps its caches across the games it plays, as they
+#                     only hold heuristic values
+#        collect_stats = return the search stats of both agents, see stats.py
+# Return: (int winner, float elapsed, dict[] game_stats) winner = 1/2, or 3 for a draw
+#         game_stats = [agent 1, agent 2] as SearchStats.as_dict, or None
+def play_one(job):
+    agent1, h1, agent2, h2, c, r, w, max_depth, seed, eval_cache, collect_stats = job
+    # Every game gets its own seed and starts from empty search tables and
+    # trees, so it does not depend on which worker ran it or what that worker
+    # played before (the agents given seconds, not a depth, still depend on
+    # how fast the machine is)
+    reset_state()
+    np.random.seed(seed)
+    random.seed(seed)
+    h1 = heuristics.HEURISTICS[h1]
+    h2 = heuristics.HEURISTICS[h2]
+    if eval_cache:
+        h1 = evalcache.get_cache(h1)
+        h2 = evalcache.get_cache(h2)
+    config = game.GameConfig(c, r, w, max_depth, collect_stats)
+    result = game.play_game(agents.AGENTS[agent1], h1, agents.AGENTS[agent2], h2, config)
+    game_stats = None
+    if result.stats is not None:
+        game_stats = [s.as_dict() for s in result.stats]
+    return result.winner, result.elapsed, game_stats
+
+
+# Every ordered pair of (agent, heuristic) players, in the order main used to play them.
+# Return: [(str agent1, str h1, str agent2, str h2), ...]
+def get_pairs(agent_names, heuristics_names):
+    players = [(a, h) for a in agent_names for h in heuristics_names]
+    return [p1 + p2 for p1 in players for p2 in players]
+
+
+# Seed of game k of pair i, derived from the tournament seed
+def game_seed(seed, i, k):
+    return int(np.random.SeedSequence([seed, i, k]).generate_state(1)[0])
+
+
+# Winrate of agent 1 over decided games, in percent, as main computed it
+def get_winrate(wins):
+    if wins[0]+wins[1] <= 1e-6:
+        return 0.0
+    return 100.0*float(wins[0])/float(wins[0]+wins[1])
+
+
+# Run a full tournament over a process pool.
+# Input: str[] agent_names, str[] heuristics_names = participants, by name
+#        int c, r, w = board size and connect #
+#        int max_depth = d passed to every agent
+#        int games_per_pair = games per ordered pair
+#        int workers = worker processes; os.cpu_count() if None, 1 runs in this process
+#        int seed = tournament seed
+#        bool record = stream each finished pair to game_data_tournament.jsonl
+#                      and export them to game_data_tournament.xlsx at the end
+#        bool eval_cache = memoize the heuristics, see evalcache.py
+#        dict pair_stats = filled with {(agent1, h1, agent2, h2): [SearchStats, SearchStats]},
+#                          the work of agent 1 and 2 over all games of the pair;
+#                          None to not collect stats
+#        schedule.AdaptiveSchedule adaptive = play each pair in batches and stop it
+#                          once settled, see schedule.py; None plays games_per_pair
+#                          games for every pair
+#        str checkpoint_path = keep the finished games in this file, see checkpoint.py;
+#                          the workbook is then only written once every pair is done
+#        bool resume = carry on from checkpoint_path if it exists, skipping the
+#                      games it holds; the run must have the same settings
+# Return: [(str agent1, str h1, str agent2, str h2, float winrate, float avg_time), ...]
+#         one row per pair, in pair order
+def run_tournament(agent_names, heuristics_names, c, r, w, max_depth, games_per_pair, workers=None, seed=0, record=True, eval_cache=False, pair_stats=None, adaptive=None, checkpoint_path=None, resume=False):
+    pairs = get_pairs(agent_names, heuristics_names)
+    wins = [[0, 0] for _ in pairs]
+    times = [0.0 for _ in pairs]
+    done = [0 for _ in pairs]
+    # Games of each pair handed out so far, and those waiting to be
+    scheduled = [0 for _ in pairs]
+    queued = [deque() for _ in pairs]
+    summary = [None for _ in pairs]
+    sink = None
+    if record:
+        sink = results.ResultsSink("game_data_tournament.jsonl", helper.TOURNAMENT_HEADERS)
+    saved = None
+    if checkpoint_path is not None:
+        config = {'agents': list(agent_names), 'heuristics': list(heuristics_names), 'c': c, 'r': r, 'w': w,
+                  'max_depth': max_depth, 'games_per_pair': games_per_pair, 'seed': seed, 'eval_cache': eval_cache,
+                  'stats': pair_stats is not None, 'adaptive': None if adaptive is None else vars(adaptive)}
+        saved = checkpoint.Checkpoint(checkpoint_path, config)
+        if not (resume and saved.load()):
+            saved.state['offset'] = None if sink is None else sink.offset
+        if sink is not None and saved.state['offset'] is not None:
+            # The rows of pairs finished before the resume are exported too
+            sink.offset = saved.state['offset']
+    # Pairs whose row is already in the results file; a crash after a row was
+    # written but before the checkpoint holding its games was saved would
+    # otherwise record the pair twice
+    recorded = set()
+    if saved is not None and saved.games and sink is not None:
+        recorded = {(row[0], row[4], row[1], row[5]) for row in sink.rows()}
+
+    def schedule_games(i, count):
+        queued[i].extend(range(scheduled[i], scheduled[i] + count))
+        scheduled[i] += count
+
+    # The next game to play: in pair order, or from the least settled pair
+    def next_job():
+        candidates = [i for i in range(len(pairs)) if queued[i]]
+        if not candidates:
+            return None
+        if adaptive is None:
+            i = candidates[0]
+        else:
+            i = max(candidates, key=lambda j: (adaptive.priority(wins[j]), -j))
+        k = queued[i].popleft()
+        return i, k, pairs[i] + (c, r, w, max_depth, game_seed(seed, i, k), eval_cache, pair_stats is not None)
+
+    # Add one game to its pair; once its games are all in, schedule more or
+    # report the pair. Games replayed from the checkpoint are not recorded again.
+    # Return: bool = the pair was reported
+    def tally(i, winner, elapsed, game_stats, replay):
+        if winner != 3:
+            wins[i][winner-1] += 1
+        times[i] += elapsed
+        done[i] += 1
+        if game_stats is not None:
+            if pairs[i] not in pair_stats:
+                pair_stats[pairs[i]] = [stats.SearchStats(), stats.SearchStats()]
+            for s, d in zip(pair_stats[pairs[i]], game_stats):
+                s.merge(stats.SearchStats.from_dict(d))
+        if done[i] < scheduled[i]:
+            return False
+        if adaptive is not None:
+            more = adaptive.next_batch(wins[i], done[i])
+            if more > 0:
+                schedule_games(i, more)
+                return False
+        winrate = get_winrate(wins[i])
+        avg_time = times[i] / done[i]
+        summary[i] = pairs[i] + (winrate, avg_time)
+        agent1, h1, agent2, h2 = pairs[i]
+        if replay:
+            return True
+        print(f'Average time: {avg_time:.4f}; {agent1}|{h1} vs {agent2}|{h2}: {winrate}% ({done[i]} games)')
+        if pair_stats is not None and pairs[i] in pair_stats:
+            for k, s in enumerate(pair_stats[pairs[i]]):
+                print(f'    agent {k+1}: {s.summary()}')
+        if sink is not None and pairs[i] not in recorded:
+            sink.add(helper.result_row(agent1, agent2, winrate, "{:.4f}".format(avg_time), h1, h2, None, max_depth, tournament=True))
+            if saved is not None:
+                sink.flush()
+        return True
+
+    # Merge game k of pair i, see tally. The game goes into the checkpoint only
+    # after its pair's row (if the pair is done) is on disk, so no checkpoint
+    # ever holds a finished pair whose row a resumed run would not write.
+    def merge(i, k, winner, elapsed, game_stats, replay=False):
+        reported = tally(i, winner, elapsed, game_stats, replay)
+        if saved is not None and not replay:
+            saved.add((i, k, winner, elapsed, game_stats))
+            if reported:
+                saved.save()
+            else:
+                saved.maybe_save()
+
+    for i in range(len(pairs)):
+        if adaptive is None:
+            schedule_games(i, games_per_pair)
+        else:
+            schedule_games(i, adaptive.next_batch(wins[i], 0))
+    if saved is not None and saved.games:
+        # In the order they were played, so adaptive pairs schedule the same batches
+        for i, k, winner, elapsed, game_stats in saved.games:
+            queued[i].remove(k)
+            merge(i, k, winner, elapsed, game_stats, replay=True)
+        print(f'Resumed from {checkpoint_path}: {len(saved.games)} games, {sum(s is not None for s in summary)} pairs done')
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    try:
+        if workers == 1:
+            while True:
+                job = next_job()
+                if job is None:
+                    break
+                i, k, job = job
+                merge(i, k, *play_one(job))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # Only a few games are handed to the pool at a time, so that
+                # the choice of the next game sees the latest results
+                running = {}
+                while True:
+                    while len(running) < 2 * workers:
+                        job = next_job()
+                        if job is None:
+                            break
+                        i, k, job = job
+                        running[pool.submit(play_one, job)] = (i, k)
+                    if not running:
+                        break
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        merge(*running.pop(future), *future.result())
+    finally:
+        finished = all(s is not None for s in summary)
+        if saved is not None:
+            if finished:
+                saved.remove()
+            else:
+                saved.save()
+        if sink is not None and (saved is None or finished):
+            # Whatever finished is written out, even if the run was interrupted;
+            # with a checkpoint, by the run that completes it
+            sink.export_xlsx("game_data_tournament.xlsx")
+    if adaptive is not None:
+        print(f'Played {sum(done)} of {adaptive.max_games * len(pairs)} games at most')
+    return summary
+
+
+# Rate every (agent, heuristic) player, see ratings.py. Instead of a round
+# robin, each game is played by the pair ratings.Ratings.pick finds most
+# informative given the games so far.
+# Input: str[] agent_names, str[] heuristics_names = participants, by name
+#        int c, r, w = board size and connect #
+#        int max_depth = d passed to every agent
+#        int games = games to play in total
+#        int workers = worker processes; os.cpu_count() if None, 1 runs in this process
+#        int seed = tournament seed
+#        bool record = stream every game to game_data_rated.jsonl, which
+#                      ratings.load can read while the run goes on
+#        bool eval_cache = memoize the heuristics, see evalcache.py
+#        ratings.Ratings rating = updated after every game, so it can be read
+#                                 during the run; a new one if None
+#        int report_every = print the standings every this many games; 0 never
+# Return: ratings.Ratings
+def run_rated(agent_names, heuristics_names, c, r, w, max_depth, games, workers=None, seed=0, record=True, eval_cache=False, rating=None, report_every=100):
+    players = {f'{a}|{h}': (a, h) for a in agent_names for h in heuristics_names}
+    names = list(players)
+    if rating is None:
+        rating = ratings.Ratings()
+    for p in names:
+        rating.add_player(p)
+    # Pairs are numbered in the order of names for their game seeds
+    pair_index = {ratings.pair_key(p, q): i for i, (p, q) in enumerate((p, q) for p in names for q in names if p < q)}
+    # Games started per pair, and those not added to rating yet
+    started = {}
+    pending = {}
+    sink = None
+    if record:
+        sink = results.ResultsSink("game_data_rated.jsonl", helper.GAME_HEADERS)
+
+    def next_job():
+        p1, p2 = rating.pick(names, pending)
+        key = ratings.pair_key(p1, p2)
+        k = started.get(key, 0)
+        started[key] = k + 1
+        pending[key] = pending.get(key, 0) + 1
+        return (p1, p2), players[p1] + players[p2] + (c, r, w, max_depth, game_seed(seed, pair_index[key], k), eval_cache, False)
+
+    def merge(pair, winner, elapsed, game_stats):
+        p1, p2 = pair
+        pending[ratings.pair_key(p1, p2)] -= 1
+        rating.add(p1, p2, winner)
+        if sink is not None:
+            agent1, h1 = players[p1]
+            agent2, h2 = players[p2]
+            sink.add(helper.result_row(agent1, agent2, winner, "{:.4f}".format(elapsed), h1, h2, [], max_depth))
+        played = sum(started.values()) - sum(pending.values())
+        if report_every and played % report_every == 0:
+            print(f'After {played} games:')
+            print(rating.summary())
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    try:
+        if workers == 1:
+            for _ in range(games):
+                pair, job = next_job()
+                merge(pair, *play_one(job))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # A few games at a time, so each pick sees the latest ratings
+                running = {}
+                left = games
+                while left > 0 or running:
+                    while left > 0 and len(running) < 2 * workers:
+                        pair, job = next_job()
+                        running[pool.submit(play_one, job)] = pair
+                        left -= 1
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        merge(running.pop(future), *future.result())
+    finally:
+        if sink is not None:
+            sink.close()
+    return rating